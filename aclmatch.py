@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Compiled matcher of cisco ACLs and object-groups
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Numbered and named IPv4 ACLs with network/service object-groups are parsed from configuration
+and compiled to decision tables: every dimension of flow (src, dst, proto, sport, dport) is split
+to elementary intervals by boundaries of all entries, every interval has bitset of entries matching it.
+Flow is classified by binary search in every dimension and AND of five bitsets, the lowest bit
+is the first matching entry, so entries are never walked one by one. Flows are classified in
+batches by NumPy.
+
+Simplifications: entries with 'established' or 'fragments' never match (flows are first packets),
+ICMP types, dscp/precedence/ttl and time-range are not matched, undefined ACL permits all (as IOS).
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import glob
+import hashlib
+import logging
+import re
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .akarlogging import get_color_logger
+from .cfgtree import iter_blocks
+from .ciscocfg import ipv4_to_int
+
+MAX_ADDR = (1 << 32) - 1
+MAX_PORT = (1 << 16) - 1
+MAX_PROTO = 255
+# Flows classified by one NumPy operation
+BATCH_SIZE = 1 << 16
+# Words of bitsets of one batch, batch of ACL with many entries has fewer flows
+BATCH_WORDS = 1 << 22
+# Non-contiguous wildcard with more bits is not expanded to intervals
+MAX_WILDCARD_BITS = 16
+
+PROTOCOLS = {
+    'icmp': 1, 'igmp': 2, 'ipinip': 4, 'tcp': 6, 'udp': 17, 'gre': 47, 'esp': 50, 'ahp': 51,
+    'eigrp': 88, 'ospf': 89, 'nos': 94, 'pim': 103, 'pcp': 108, 'sctp': 132,
+}
+PORTS = {
+    'bgp': 179, 'bootpc': 68, 'bootps': 67, 'chargen': 19, 'cmd': 514, 'daytime': 13, 'discard': 9, 'domain': 53,
+    'echo': 7, 'exec': 512, 'finger': 79, 'ftp': 21, 'ftp-data': 20, 'gopher': 70, 'hostname': 101, 'ident': 113,
+    'irc': 194, 'isakmp': 500, 'klogin': 543, 'kshell': 544, 'login': 513, 'lpd': 515, 'msrpc': 135, 'nntp': 119,
+    'netbios-dgm': 138, 'netbios-ns': 137, 'netbios-ss': 139, 'non500-isakmp': 4500, 'ntp': 123, 'pim-auto-rp': 496,
+    'pop2': 109, 'pop3': 110, 'rip': 520, 'smtp': 25, 'snmp': 161, 'snmptrap': 162, 'sunrpc': 111, 'syslog': 514,
+    'tacacs': 49, 'talk': 517, 'telnet': 23, 'tftp': 69, 'time': 37, 'uucp': 540, 'who': 513, 'whois': 43,
+    'www': 80, 'xdmcp': 177,
+}
+_PORT_OPERATORS = ('eq', 'neq', 'lt', 'gt', 'range')
+# Options of entry which make it never match first packet of flow
+_NEVER_MATCH = ('established', 'fragments')
+
+_RE_ACCESS_GROUP = re.compile(r'^\s*ip access-group (\S+) (in|out)')
+_RE_HOSTNAME = re.compile(r'^hostname\s+(\S+)')
+_ACL_BLOCKS = ('hostname', 'interface', 'access-list', 'ip access-list', 'object-group')
+
+
+def _is_ipv4(token):
+    return token.count('.') == 3 and token.replace('.', '').isdigit()
+
+
+def wildcard_intervals(addr, wildcard):
+    """
+    Returns list of intervals (low, high) of addresses matched by address and wildcard mask
+    """
+    low_bits = 0
+    while low_bits < 32 and wildcard & (1 << low_bits):
+        low_bits += 1
+    low_mask = (1 << low_bits) - 1
+    high = wildcard & ~low_mask
+    base = addr & ~wildcard & MAX_ADDR
+    high_bits = [bit for bit in range(32) if high & (1 << bit)]
+    if len(high_bits) > MAX_WILDCARD_BITS:
+        raise ValueError(f'Wildcard with too many non-contiguous bits: {wildcard:#x}')
+    resp = []
+    for num in range(1 << len(high_bits)):
+        value = base
+        for pos, bit in enumerate(high_bits):
+            if num & (1 << pos):
+                value |= 1 << bit
+        resp.append((value, value | low_mask))
+    return sorted(resp)
+
+
+def port_number(token):
+    if token.isdigit():
+        return int(token)
+    return PORTS[token]
+
+
+def proto_number(token):
+    if token.isdigit():
+        return int(token)
+    return PROTOCOLS[token]
+
+
+def _is_port(token):
+    return token.isdigit() or token in PORTS
+
+
+def _parse_ports(tokens, pos):
+    """
+    Returns (list of intervals of ports, next position), all ports if there is no operator
+    """
+    if pos >= len(tokens) or tokens[pos] not in _PORT_OPERATORS:
+        return [(0, MAX_PORT)], pos
+    operator = tokens[pos]
+    pos += 1
+    if operator == 'range':
+        return [(port_number(tokens[pos]), port_number(tokens[pos + 1]))], pos + 2
+    port = port_number(tokens[pos])
+    pos += 1
+    if operator == 'lt':
+        return [(0, port - 1)] if port > 0 else [], pos
+    if operator == 'gt':
+        return [(port + 1, MAX_PORT)] if port < MAX_PORT else [], pos
+    ports = [port]
+    while pos < len(tokens) and _is_port(tokens[pos]):
+        ports.append(port_number(tokens[pos]))
+        pos += 1
+    if operator == 'eq':
+        return sorted((port, port) for port in set(ports)), pos
+    # neq: all ports except listed
+    resp = []
+    start = 0
+    for port in sorted(set(ports)):
+        if port > start:
+            resp.append((start, port - 1))
+        start = port + 1
+    if start <= MAX_PORT:
+        resp.append((start, MAX_PORT))
+    return resp, pos
+
+
+class ObjectGroups():
+    """[Class ObjectGroups]
+
+    Network and service object-groups of configuration, nested groups (group-object) are resolved on access
+    """
+
+    def __init__(self):
+        # name: list of children lines
+        self.network_lines = dict()
+        self.service_lines = dict()
+        self._network = dict()
+        self._service = dict()
+
+    def add_block(self, block):
+        words = block.text.split()
+        if len(words) < 3:
+            return
+        lines = [child.text.strip() for child in block.children]
+        if words[1] == 'network':
+            self.network_lines[words[2]] = lines
+        elif words[1] == 'service':
+            self.service_lines[words[2]] = lines
+
+    def network(self, name, _seen=()):
+        """
+        Returns list of intervals of addresses of network object-group
+        """
+        if name not in self._network:
+            if name in _seen or name not in self.network_lines:
+                raise ValueError(f'Unknown or recursive network object-group: {name}')
+            resp = []
+            for line in self.network_lines[name]:
+                tokens = line.split()
+                if not tokens or tokens[0] == 'description':
+                    continue
+                if tokens[0] == 'host':
+                    addr = ipv4_to_int(tokens[1])
+                    resp.append((addr, addr))
+                elif tokens[0] == 'range':
+                    resp.append((ipv4_to_int(tokens[1]), ipv4_to_int(tokens[2])))
+                elif tokens[0] == 'any':
+                    resp.append((0, MAX_ADDR))
+                elif tokens[0] == 'group-object':
+                    resp.extend(self.network(tokens[1], _seen + (name,)))
+                elif _is_ipv4(tokens[0]):
+                    # address and netmask
+                    mask = ipv4_to_int(tokens[1]) if len(tokens) > 1 else MAX_ADDR
+                    resp.extend(wildcard_intervals(ipv4_to_int(tokens[0]), ~mask & MAX_ADDR))
+            self._network[name] = resp
+        return self._network[name]
+
+    def service(self, name, _seen=()):
+        """
+        Returns list of (protocols, source ports, destination ports) (lists of intervals) of service object-group
+        """
+        if name not in self._service:
+            if name in _seen or name not in self.service_lines:
+                raise ValueError(f'Unknown or recursive service object-group: {name}')
+            resp = []
+            for line in self.service_lines[name]:
+                tokens = line.split()
+                if not tokens or tokens[0] == 'description':
+                    continue
+                if tokens[0] == 'group-object':
+                    resp.extend(self.service(tokens[1], _seen + (name,)))
+                    continue
+                protos = [6, 17] if tokens[0] == 'tcp-udp' else [proto_number(tokens[0])] if tokens[0] != 'ip' else None
+                sports = dports = [(0, MAX_PORT)]
+                pos = 1
+                if pos < len(tokens) and tokens[pos] == 'source':
+                    sports, pos = _parse_ports(tokens, pos + 1)
+                if pos < len(tokens) and tokens[pos] in _PORT_OPERATORS:
+                    dports, pos = _parse_ports(tokens, pos)
+                if protos is None:
+                    resp.append(([(0, MAX_PROTO)], [(0, MAX_PORT)], [(0, MAX_PORT)]))
+                else:
+                    resp.extend(([(proto, proto)], sports, dports) for proto in protos)
+            self._service[name] = resp
+        return self._service[name]
+
+
+class Ace():
+    """[Class Ace]
+
+    Entry of ACL: action and list of rules (src, dst, proto, sport, dport as lists of intervals)
+    """
+
+    __slots__ = ('action', 'text', 'rules')
+
+    def __init__(self, action, text, rules):
+        self.action = action
+        self.text = text
+        self.rules = rules
+
+    def __repr__(self):
+        return f'<Ace {self.text!r}>'
+
+    @property
+    def permit(self):
+        return self.action == 'permit'
+
+
+def _parse_addr(tokens, pos, groups, standard=False):
+    """
+    Returns (list of intervals of addresses, next position)
+    """
+    token = tokens[pos]
+    if token == 'any':
+        return [(0, MAX_ADDR)], pos + 1
+    if token == 'host':
+        addr = ipv4_to_int(tokens[pos + 1])
+        return [(addr, addr)], pos + 2
+    if token in ('object-group', 'addrgroup'):
+        return groups.network(tokens[pos + 1]), pos + 2
+    addr = ipv4_to_int(token)
+    if pos + 1 < len(tokens) and _is_ipv4(tokens[pos + 1]):
+        return wildcard_intervals(addr, ipv4_to_int(tokens[pos + 1])), pos + 2
+    if standard:
+        return [(addr, addr)], pos + 1
+    raise ValueError(f'Wildcard is expected after address: {token}')
+
+
+def parse_ace(text, groups, standard=False):
+    """
+    Parses entry of ACL ('[seq] permit|deny ...'), returns Ace or None for remarks and not supported entries
+    """
+    tokens = text.split()
+    if tokens and tokens[0].isdigit():
+        tokens = tokens[1:]
+    if not tokens or tokens[0] not in ('permit', 'deny'):
+        return None
+    action = tokens[0]
+    if standard:
+        (src, _pos) = _parse_addr(tokens, 1, groups, standard=True)
+        return Ace(action, text, [(src, [(0, MAX_ADDR)], [(0, MAX_PROTO)], [(0, MAX_PORT)], [(0, MAX_PORT)])])
+    pos = 1
+    services = None
+    if tokens[pos] == 'object-group':
+        services = groups.service(tokens[pos + 1])
+        pos += 2
+    else:
+        proto = tokens[pos]
+        pos += 1
+    (src, pos) = _parse_addr(tokens, pos, groups)
+    sports = dports = [(0, MAX_PORT)]
+    with_ports = services is None and proto in ('tcp', 'udp', '6', '17')
+    if with_ports:
+        sports, pos = _parse_ports(tokens, pos)
+    (dst, pos) = _parse_addr(tokens, pos, groups)
+    if with_ports:
+        dports, pos = _parse_ports(tokens, pos)
+    if any(option in tokens[pos:] for option in _NEVER_MATCH):
+        return Ace(action, text, [])
+    if services is None:
+        protos = [(0, MAX_PROTO)] if proto == 'ip' else [(proto_number(proto), proto_number(proto))]
+        return Ace(action, text, [(src, dst, protos, sports, dports)])
+    return Ace(action, text, [(src, dst, protos, svc_sports, svc_dports) for (protos, svc_sports, svc_dports) in services])
+
+
+def _sweep(events, num_rules, num_words):
+    # Yields (boundary, bitset of rules covering boundary), bitset is one array changed in place
+    # rule: number of its intervals covering boundary (intervals of object-groups can overlap)
+    counts = [0] * num_rules
+    bits = np.zeros(num_words, dtype=np.uint64)
+    for point in sorted(events):
+        for (num, delta) in events[point]:
+            count = counts[num]
+            counts[num] = count + delta
+            if not count or not count + delta:
+                bits[num >> 6] ^= np.uint64(1 << (num & 63))
+        yield point, bits
+
+
+class _Dimension():
+    # Elementary intervals of one dimension: starts of intervals, number of bitset of every interval and
+    # distinct bitsets (uint64 words) of rules. Bitsets are built incrementally by sweep over boundaries,
+    # only changes of bitset are stored: adjacent intervals with the same rules are one interval.
+    # The first sweep numbers distinct bitsets by their hash, the second one fills them
+
+    __slots__ = ('starts', 'index', 'words')
+
+    def __init__(self, rule_intervals, num_words):
+        # boundary: rules starting (+1) or ending (-1) at it
+        events = {0: []}
+        for num, intervals in enumerate(rule_intervals):
+            for (low, high) in intervals:
+                events.setdefault(low, []).append((num, 1))
+                events.setdefault(high + 1, []).append((num, -1))
+        # hash of bitset: number of bitset
+        rows = dict()
+        # boundary number: number of bitset first seen at it
+        first = dict()
+        starts = []
+        index = []
+        for num, (point, bits) in enumerate(_sweep(events, len(rule_intervals), num_words)):
+            row = rows.setdefault(hashlib.blake2b(bits.tobytes(), digest_size=16).digest(), len(rows))
+            if row == len(first):
+                first[num] = row
+            if not index or index[-1] != row:
+                starts.append(point)
+                index.append(row)
+        self.starts = np.array(starts, dtype=np.int64)
+        self.index = np.array(index, dtype=np.int64)
+        self.words = np.empty((len(rows), num_words), dtype=np.uint64)
+        for num, (_point, bits) in enumerate(_sweep(events, len(rule_intervals), num_words)):
+            if num in first:
+                self.words[first[num]] = bits
+
+    def lookup(self, values):
+        return self.words[self.index[np.searchsorted(self.starts, values, side='right') - 1]]
+
+
+class Acl():
+    """[Class Acl]
+
+    ACL compiled to decision tables on first use
+    """
+
+    def __init__(self, name, kind='extended'):
+        self.name = name
+        self.kind = kind
+        self.entries = []
+        self._rule_ace = None
+        self._dimensions = None
+
+    def __repr__(self):
+        return f'<Acl {self.name} {self.kind} entries: {len(self.entries)}>'
+
+    def add(self, ace):
+        self.entries.append(ace)
+        self._dimensions = None
+
+    def compile(self):
+        rules = []
+        rule_ace = []
+        for num, ace in enumerate(self.entries):
+            for rule in ace.rules:
+                rules.append(rule)
+                rule_ace.append(num)
+        num_words = max(1, (len(rules) + 63) // 64)
+        self._rule_ace = np.array(rule_ace + [-1], dtype=np.int64)
+        self._dimensions = [_Dimension([rule[dim] for rule in rules], num_words) for dim in range(5)]
+
+    def classify(self, src, dst, proto, sport, dport):
+        """
+        Classifies flows (arrays of integers), returns array of indexes of matched entries, -1 - implicit deny
+        """
+        if self._dimensions is None:
+            self.compile()
+        resp = np.empty(len(src), dtype=np.int64)
+        batch = min(BATCH_SIZE, max(1, BATCH_WORDS // self._dimensions[0].words.shape[1]))
+        for start in range(0, len(src), batch):
+            part = slice(start, start + batch)
+            acc = self._dimensions[0].lookup(src[part])
+            for dim, values in zip(self._dimensions[1:], (dst[part], proto[part], sport[part], dport[part])):
+                acc &= dim.lookup(values)
+            nonzero = acc != 0
+            word = nonzero.argmax(axis=1)
+            found = nonzero[np.arange(len(word)), word]
+            value = acc[np.arange(len(word)), word]
+            lowest = value & (~value + np.uint64(1))
+            bit = np.zeros(len(word), dtype=np.int64)
+            bit[found] = np.log2(lowest[found].astype(np.float64)).astype(np.int64)
+            rule = np.where(found, word * 64 + bit, len(self._rule_ace) - 1)
+            resp[part] = self._rule_ace[rule]
+        return resp
+
+    def permits(self, src, dst, proto, sport, dport):
+        """
+        Returns bool array: flows permitted by ACL
+        """
+        matched = self.classify(src, dst, proto, sport, dport)
+        permit = np.array([ace.permit for ace in self.entries] + [False], dtype=bool)
+        return permit[matched]
+
+    def match(self, flow):
+        """
+        Returns entry (Ace) matched by one flow (src, dst, proto, sport, dport) or None (implicit deny)
+        """
+        num = self.classify(*flow_arrays([flow]))[0]
+        return self.entries[num] if num >= 0 else None
+
+
+def flow_arrays(flows):
+    """
+    Converts flows (src, dst, proto, sport, dport), addresses as strings or integers,
+    protocols as names or numbers, to tuple of five NumPy arrays
+    """
+    columns = ([], [], [], [], [])
+    for (src, dst, proto, sport, dport) in flows:
+        columns[0].append(ipv4_to_int(src) if isinstance(src, str) else src)
+        columns[1].append(ipv4_to_int(dst) if isinstance(dst, str) else dst)
+        columns[2].append(proto_number(proto) if isinstance(proto, str) else proto)
+        columns[3].append(port_number(sport) if isinstance(sport, str) else sport)
+        columns[4].append(port_number(dport) if isinstance(dport, str) else dport)
+    return tuple(np.array(column, dtype=np.int64) for column in columns)
+
+
+def _numbered_kind(number):
+    number = int(number)
+    if 1 <= number <= 99 or 1300 <= number <= 1999:
+        return 'standard'
+    if 100 <= number <= 199 or 2000 <= number <= 2699:
+        return 'extended'
+    return None
+
+
+def parse_acls(config_input):
+    """
+    Parses configuration (file or list of lines), returns tuple (hostname, {name: Acl}, list of (interface, acl, direction))
+    """
+    hostname = 'None'
+    groups = ObjectGroups()
+    acl_lines = []
+    bindings = []
+    for block in iter_blocks(config_input, keep=_ACL_BLOCKS):
+        words = block.text.split()
+        if words[0] == 'hostname':
+            res = _RE_HOSTNAME.search(block.text)
+            if res:
+                hostname = res.group(1)
+        elif words[0] == 'interface':
+            for child in block.children:
+                res = _RE_ACCESS_GROUP.search(child.text)
+                if res:
+                    bindings.append((words[1], res.group(1), res.group(2)))
+        elif words[0] == 'object-group':
+            groups.add_block(block)
+        elif words[0] == 'access-list' and len(words) > 2 and _numbered_kind(words[1]) is not None:
+            acl_lines.append((words[1], _numbered_kind(words[1]), [' '.join(words[2:])]))
+        elif words[0] == 'ip' and len(words) > 3 and words[2] in ('standard', 'extended'):
+            acl_lines.append((words[3], words[2], [child.text.strip() for child in block.children]))
+    # ACLs are parsed when all object-groups are known
+    acls = dict()
+    for (name, kind, lines) in acl_lines:
+        acl = acls.setdefault(name, Acl(name, kind))
+        for line in lines:
+            ace = parse_ace(line, groups, standard=kind == 'standard')
+            if ace is not None:
+                acl.add(ace)
+    return hostname, acls, bindings
+
+
+def _parse_acls(config_input):
+    try:
+        return parse_acls(config_input), None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+
+class AclIndex():
+    """[Class AclIndex]
+
+    ACLs of devices and interfaces they are applied to. Every ACL is compiled once and
+    classifies all flows of query by one batch, interfaces with the same ACL share the result.
+    Devices are kept by hostname, configuration with hostname of previous one is stored in self.errors
+    """
+
+    def __init__(self, configs, workers=1, dbg=logging.INFO):
+        self.__logger = get_color_logger("AclIndex", dbg)
+        if isinstance(configs, str):
+            configs = sorted(glob.glob(configs))
+        configs = [getattr(config, 'file_input', config) for config in configs]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_parse_acls, configs, chunksize=max(1, len(configs) // (workers * 4))))
+        else:
+            results = [_parse_acls(config_input) for config_input in configs]
+        # hostname: {name: Acl}
+        self.acls = dict()
+        # list of (hostname, interface, acl name, direction)
+        self.bindings = []
+        self.errors = []
+        for config_input, (res, error) in zip(configs, results):
+            if error is not None:
+                self.__logger.error(f'Configuration: {config_input} Error: {error}')
+                self.errors.append((config_input, error))
+                continue
+            (hostname, acls, bindings) = res
+            if hostname in self.acls:
+                error = f'Duplicate hostname: {hostname}'
+                self.__logger.error(f'Configuration: {config_input} Error: {error}')
+                self.errors.append((config_input, error))
+                continue
+            self.acls[hostname] = acls
+            self.bindings.extend((hostname, interface, name, direction) for (interface, name, direction) in bindings)
+        self.__logger.info(f'Devices: {len(self.acls)} ACLs: {sum(len(acls) for acls in self.acls.values())} bindings: {len(self.bindings)}')
+
+    def acl(self, hostname, name):
+        return self.acls.get(hostname, dict()).get(name)
+
+    def permit_matrix(self, flows, direction=None):
+        """
+        Returns tuple (list of bindings (hostname, interface, acl, direction), bool matrix bindings x flows of permitted flows).
+        Undefined ACL permits all flows
+        """
+        arrays = flow_arrays(flows)
+        bindings = [binding for binding in self.bindings if direction is None or binding[3] == direction]
+        matrix = np.ones((len(bindings), len(arrays[0])), dtype=bool)
+        results = dict()
+        for num, (hostname, _interface, name, _direction) in enumerate(bindings):
+            acl = self.acl(hostname, name)
+            if acl is None:
+                continue
+            if id(acl) not in results:
+                results[id(acl)] = acl.permits(*arrays)
+            matrix[num] = results[id(acl)]
+        return bindings, matrix
+
+    def permitting(self, flow, direction=None):
+        """
+        Returns list of (hostname, interface, acl, direction) which permit flow (src, dst, proto, sport, dport)
+        """
+        (bindings, matrix) = self.permit_matrix([flow], direction)
+        return [binding for binding, permitted in zip(bindings, matrix[:, 0]) if permitted]
@@ -13,6 +13,7 @@ version: 1.0
 """
 
 import coloredlogs
+import functools
 import warnings
 import logging
 from rich.logging import RichHandler
@@ -67,3 +68,11 @@ class AkarLogging:
         logger.propagate = False
 
         return logger
+
+
+@functools.lru_cache(maxsize=None)
+def get_color_logger(log_name, level):
+    """
+    Returns color logger, coloredlogs is installed only once for every name and level
+    """
+    return AkarLogging(level, log_name).get_color_logger()
@@ -26,6 +26,7 @@ from nornir import InitNornir
 from datetime import datetime
 from nornir.plugins.tasks.text import template_file
 from nornir.plugins.tasks.networking import netmiko_send_config, napalm_configure, netmiko_send_command
+import akarlibs.cdp as cdp
 warnings.filterwarnings(action='ignore', module='.*paramiko.*')
 
 
@@ -199,13 +200,20 @@ class AlexNornir:
             if self._save_to_file:
                 self.write_to_file(i.lower(), to_file, flag_config=True)
 
-    def get_cdp(self, out_dir=""):
+    def get_cdp(self, out_dir="", tracker=None):
+        '''
+        Saves cdp neighbours of hosts. If tracker (cdpchanges.CdpTracker) is given,
+        returns CdpChanges of adjacencies against the previous run.
+        '''
         if out_dir:
             tmp_dir = self._output_dir
             self._output_dir = out_dir
         res = self._nor.run(task=self.run_cmds_task, cmds='show cdp nei deta')
+        devices_cdp = []
         for i in res:
             to_file = ""
+            if tracker is not None and not res[i].failed:
+                devices_cdp.append(cdp.Device('\n'.join(str(res[i][j]) for j in range(1, len(res[i]))), hostname=f'{i}'))
             self.print_title_host(f'{i}', flag_center=True)
             for j in range(1, len(res[i])):
                 self.print_title_result(f'{res[i][j].name}')
@@ -216,6 +224,8 @@ class AlexNornir:
                 self.write_to_file(i.lower(), to_file, flag_config=True)
         if out_dir:
             self._output_dir = tmp_dir
+        if tracker is not None:
+            return tracker.update(devices_cdp)
 
     @classmethod
     def ospf_info_task(cls, task, ospf):
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Read configuration and cdp files from archives
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Reading of members of tar (gz, bz2, xz) and zip archives as streams, without extraction to disk.
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import fnmatch
+import tarfile
+import zipfile
+
+ARCHIVE_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz', '.zip')
+
+
+def is_archive(path):
+    return path.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def member_label(archive_path, member):
+    """
+    Name of member used instead of file name: <archive>::<member>
+    """
+    return f'{archive_path}::{member}'
+
+
+def split_label(label):
+    """
+    Returns tuple (archive path, member) of label of member or None if label is not a member of archive
+    """
+    (archive_path, sep, member) = label.partition('::')
+    if not sep or not member or not is_archive(archive_path):
+        return None
+    return archive_path, member
+
+
+def read_member(label):
+    """
+    Returns content in bytes of member of archive by its label '<archive>::<member>'
+    """
+    (archive_path, member) = split_label(label)
+    if archive_path.lower().endswith('.zip'):
+        with zipfile.ZipFile(archive_path) as zip_f:
+            return zip_f.read(member)
+    with tarfile.open(archive_path, 'r:*') as tar_f:
+        input_f = tar_f.extractfile(member)
+        if input_f is None:
+            raise KeyError(f'Member is not a file: {label}')
+        return input_f.read()
+
+
+def iter_members(archive_path, pattern='*'):
+    """
+    Yields tuples (name of member, content in bytes) of files of archive matching pattern.
+    tar archives are read in stream mode, one pass without seeking
+    """
+    if archive_path.lower().endswith('.zip'):
+        with zipfile.ZipFile(archive_path) as zip_f:
+            for info in zip_f.infolist():
+                if not info.is_dir() and fnmatch.fnmatch(info.filename, pattern):
+                    yield info.filename, zip_f.read(info)
+    else:
+        with tarfile.open(archive_path, 'r|*') as tar_f:
+            for member in tar_f:
+                if member.isfile() and fnmatch.fnmatch(member.name, pattern):
+                    yield member.name, tar_f.extractfile(member).read()
+
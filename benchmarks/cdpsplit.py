@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Fuzz and performance check of splitting of cdp output to blocks and extraction of entries
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Random outputs of 'show cdp neighbor detail' (separators of different length, CRLF, blank lines,
+dashes inside values, lines starting with '-') are split by cdp.split_blocks and compared with
+reference split by separator lines, Device ID of every entry is checked, values of cdp.extract_properties
+are compared with the previous regular expressions (one per key).
+Time of cdp.split_blocks and cdp.extract_properties and of the previous regular expressions is measured on big synthetic output.
+Usage: python -m akarlibs.benchmarks.cdpsplit [cases] [neighbours]
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import random
+import re
+import sys
+import time
+from .. import cdp
+from . import synth
+
+_RE_OLD = re.compile(r'-----+((?:.*|\n+)+?)(?:-|$)')
+_RE_SEPARATOR = re.compile(r'(?m)^[ \t]*-{5,}[ \t]*\r?$')
+# Patterns of keys of cdp entry used by reference_properties
+_KEYS = {
+    'device_id': 'Device ID:',
+    'ip_address': r'(?:IP address|IPv4 Address):',
+    'platform': r'Platform: (?:cisco)?',
+    'capabilities': 'Capabilities:',
+    'local_port': 'Interface:',
+    'remote_port': r'Port ID \(outgoing port\):',
+}
+
+
+def reference_blocks(text):
+    """
+    Returns list of non blank blocks between separator lines
+    """
+    blocks = []
+    for block in _RE_SEPARATOR.split(text)[1:]:
+        lines = block.splitlines()
+        while lines and not lines[0].strip():
+            lines.pop(0)
+        if lines:
+            blocks.append('\n'.join(lines))
+    return blocks
+
+
+def reference_properties(block):
+    """
+    Returns dictionary {key: value} of block by one regex per key (extractor used before cdp.extract_properties)
+    """
+    resp = dict()
+    for key, pattern in _KEYS.items():
+        res = re.search(r'{}\s?(.*)'.format(pattern), block)
+        resp[key] = res.group(1).split(',')[0].strip() if res else None
+    return resp
+
+
+def random_output(rnd, count):
+    """
+    Returns tuple (text of cdp output, list of device ids)
+    """
+    devices = [f'SW-{rnd.randint(0, 99999)}-{rnd.choice(("core", "acc", "--x"))}' for _num in range(count)]
+    lines = [f'SW-LOCAL#show cdp neighbors detail{rnd.choice(("", " | begin -----"))}']
+    for device in devices:
+        lines.append(rnd.choice(('', ' ', '\t')) + '-' * rnd.randint(5, 40))
+        lines += [''] * rnd.randint(0, 2)
+        lines += [f'Device ID: {device}', 'Entry address(es): ', f'  IP address: 10.{rnd.randint(0, 255)}.0.1',
+                  f'Platform: cisco {rnd.choice(synth.PLATFORMS)}-{"-" * rnd.randint(0, 6)},  Capabilities: Switch ',
+                  f'Interface: {synth.l2_port(rnd.randint(0, 47))},  Port ID (outgoing port): {synth.l2_port(rnd.randint(0, 47))}',
+                  'Holdtime : 137 sec', '', 'Version :']
+        if rnd.random() < 0.3:
+            lines += ['- line starting with dash', '---- short dashes ----', '----']
+        lines += ['Native VLAN: 1', '']
+    lines.append(f'Total cdp entries displayed : {count}')
+    text = rnd.choice(('\n', '\r\n')).join(lines)
+    return text, devices
+
+
+def fuzz(cases=500, seed=1):
+    """
+    Returns list of failures (text) of random outputs
+    """
+    rnd = random.Random(seed)
+    failures = []
+    for case in range(cases):
+        (text, devices) = random_output(rnd, rnd.randint(0, 20))
+        blocks = cdp.split_blocks(text)
+        if blocks != reference_blocks(text):
+            failures.append(f'case {case}: blocks differ from reference')
+            continue
+        if any(cdp.extract_properties(block) != reference_properties(block) for block in blocks):
+            failures.append(f'case {case}: properties differ from reference')
+            continue
+        found = [entry.device_id for entry in cdp.Device(text, hostname='SW-LOCAL').cdp_entries]
+        if found != devices:
+            failures.append(f'case {case}: device ids {found} != {devices}')
+    return failures
+
+
+def measure(func, text, repeat=3):
+    best = None
+    for _num in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    cases = int(argv[0]) if argv else 500
+    neighbours = int(argv[1]) if len(argv) > 1 else 5000
+    failures = fuzz(cases)
+    for text in failures[:10]:
+        print(f'FAIL {text}')
+    print(f'Fuzz cases: {cases} failures: {len(failures)}')
+    sizes = synth.SynthConfig(neighbours=neighbours)
+    text = '\n'.join(synth.generate_cdp(0, neighbours + 1, sizes)) + '\n'
+    print(f'Output: {len(text) / (1 << 20):.1f} MB entries: {len(synth.neighbours_of(0, neighbours + 1, sizes))}')
+    for (name, func) in (('split_blocks', cdp.split_blocks), ('regex', _RE_OLD.findall)):
+        seconds = measure(func, text)
+        print(f'{name:22s} {seconds:8.4f} s {len(text) / (1 << 20) / seconds:8.1f} MB/s')
+    blocks = cdp.split_blocks(text)
+    for (name, func) in (('extract_properties', cdp.extract_properties), ('regex per key', reference_properties)):
+        seconds = measure(lambda items: [func(block) for block in items], blocks)
+        print(f'{name:22s} {seconds:8.4f} s {len(blocks) / seconds:8.0f} entries/s')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Micro-benchmark of key tables of ciscocfg
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Micro-benchmark of key tables of ciscocfg: lines per second with the
+per-call formatted re.search (before) and with compiled KeyMatcher (after)
+Usage: python -m akarlibs.benchmarks.keys [number of interfaces]
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import re
+import sys
+import time
+from .. import ciscocfg
+
+_L3_BLOCK = [
+    'interface GigabitEthernet0/{num}.{num}',
+    ' description link to R{num}, core',
+    ' encapsulation dot1Q {num}',
+    ' vrf forwarding VRF{num}',
+    ' ip address 10.1.{num}.1 255.255.255.0',
+    ' ip address 10.2.{num}.1 255.255.255.0 secondary',
+    ' ip access-group ACL_IN in',
+    ' ip helper-address 10.0.0.1',
+    ' standby 1 ip 10.1.{num}.254',
+    ' standby 1 priority 110',
+    ' no ip redirects',
+    ' shutdown',
+]
+
+_L2_BLOCK = [
+    'interface GigabitEthernet1/0/{num}',
+    ' description access port',
+    ' switchport access vlan 10',
+    ' switchport trunk allowed vlan 10,20,30',
+    ' switchport mode trunk',
+    ' channel-group 5 mode active',
+    ' spanning-tree portfast',
+    ' speed 1000',
+]
+
+
+def _legacy_l3(fields, line):
+    for key, val in ciscocfg._KEYS_L3_INT.items():
+        res = re.search(r'{}\s?(.*)'.format(val), line)
+        if res:
+            ret = res.group(1).split(',')[0].strip()
+            if ret != "":
+                if fields[key] == "":
+                    fields[key] = ret
+                else:
+                    fields[key] += f', {ret}'
+
+
+def _legacy_l2(fields, line):
+    for key, val in ciscocfg._KEYS_L2_INT.items():
+        res = re.search(r'{}\s?(.*)'.format(val), line, re.DOTALL)
+        if res:
+            fields[key] = res.group(1).strip()
+
+
+def _compiled_l3(fields, line):
+    for key, res in ciscocfg._MATCHER_L3_INT.match(line):
+        ret = res.group(1).split(',')[0].strip()
+        if ret != "":
+            if fields[key] == "":
+                fields[key] = ret
+            else:
+                fields[key] += f', {ret}'
+
+
+def _compiled_l2(fields, line):
+    for key, res in ciscocfg._MATCHER_L2_INT.match(line):
+        fields[key] = res.group(1).strip()
+
+
+def _run(func, keys, blocks):
+    start = time.perf_counter()
+    lines = 0
+    for block in blocks:
+        fields = dict.fromkeys(keys, "")
+        for line in block:
+            func(fields, line)
+        lines += len(block)
+    return lines / (time.perf_counter() - start)
+
+
+def main(count=2000):
+    l3_blocks = [[ln.format(num=num) for ln in _L3_BLOCK] for num in range(count)]
+    l2_blocks = [[ln.format(num=num) for ln in _L2_BLOCK] for num in range(count)]
+    tests = [
+        ('L3 interfaces', ciscocfg._KEYS_L3_INT, l3_blocks, _legacy_l3, _compiled_l3),
+        ('L2 interfaces', ciscocfg._KEYS_L2_INT, l2_blocks, _legacy_l2, _compiled_l2),
+    ]
+    print(f'{"Table":15s} {"before, lines/s":>18s} {"after, lines/s":>18s} {"speedup":>8s}')
+    for name, keys, blocks, legacy, compiled in tests:
+        before = _run(legacy, keys, blocks)
+        after = _run(compiled, keys, blocks)
+        print(f'{name:15s} {before:18,.0f} {after:18,.0f} {after / before:7.1f}x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Benchmark suite of ciscocfg and cdp parsers
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Throughput and peak memory (tracemalloc) of CiscoDevice, ListDevices and cdp.Device
+on synthetic estate generated by benchmarks.synth. Results can be saved to json and
+compared with saved baseline: rate lower or peak memory higher than tolerance is a regression.
+Usage: python -m akarlibs.benchmarks.suite [--devices N] [--interfaces N] [--workers N]
+                                           [--json results.json] [--baseline baseline.json] [--tolerance 0.15]
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from .. import cdp
+from .. import ciscocfg
+from . import synth
+
+
+def measure(func, repeat=3):
+    """
+    Returns tuple (best time of repeat runs in seconds, peak of memory in bytes of one traced run)
+    """
+    best = None
+    for _num in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def _count_lines(file_name):
+    with open(file_name) as input_f:
+        return sum(1 for _line in input_f)
+
+
+def run_suite(devices=20, interfaces=400, workers=1, repeat=3, sizes=None):
+    """
+    Returns list of results {'name', 'items', 'unit', 'seconds', 'rate', 'peak_mb'}
+    """
+    sizes = sizes if sizes is not None else synth.SynthConfig(interfaces=interfaces)
+    results = []
+
+    def add(name, func, items, unit):
+        (seconds, peak) = measure(func, repeat)
+        results.append({
+            'name': name,
+            'items': items,
+            'unit': unit,
+            'seconds': round(seconds, 4),
+            'rate': round(items / seconds, 1),
+            'peak_mb': round(peak / (1 << 20), 2),
+        })
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        (path_config, path_cdp) = synth.write_estate(tmp_dir, devices, sizes)
+        file_config = f'{tmp_dir}/{synth.hostname(0).lower()}-config.txt'
+        lines = _count_lines(file_config)
+        options = dict(flag_l3_int=True, flag_vlans=True, flag_l2_int=True, dbg=logging.WARNING)
+        add('CiscoDevice', lambda: ciscocfg.CiscoDevice(file_config, **options), lines, 'lines')
+        add('CiscoDevice streaming', lambda: ciscocfg.CiscoDevice(file_config, streaming=True, **options), lines, 'lines')
+
+        big_cdp = synth.SynthConfig(neighbours=min(2 * devices, 400), seed=sizes.seed)
+        cdp_text = '\n'.join(synth.generate_cdp(0, 2 * devices + 1, big_cdp)) + '\n'
+        entries = len(synth.neighbours_of(0, 2 * devices + 1, big_cdp))
+        add('cdp.Device', lambda: cdp.Device(cdp_text, hostname=synth.hostname(0)), entries, 'entries')
+
+        total_lines = devices * lines
+        add('ListDevices', lambda: ciscocfg.ListDevices(path_config, path_to_cdp=path_cdp, **options), total_lines, 'lines')
+        if workers > 1:
+            add(f'ListDevices workers={workers}', lambda: ciscocfg.ListDevices(path_config, path_to_cdp=path_cdp, workers=workers, **options),
+                total_lines, 'lines')
+    return results
+
+
+def compare(results, baseline, tolerance=0.15):
+    """
+    Returns list of regressions (text) of results against baseline (list of results)
+    """
+    base = {res['name']: res for res in baseline}
+    resp = []
+    for res in results:
+        if res['name'] not in base:
+            continue
+        old = base[res['name']]
+        if res['rate'] < old['rate'] * (1 - tolerance):
+            resp.append(f"{res['name']}: rate {res['rate']:,.0f} {res['unit']}/s, baseline {old['rate']:,.0f}")
+        if res['peak_mb'] > old['peak_mb'] * (1 + tolerance) and res['peak_mb'] - old['peak_mb'] > 1:
+            resp.append(f"{res['name']}: peak {res['peak_mb']} MB, baseline {old['peak_mb']} MB")
+    return resp
+
+
+def print_results(results):
+    print(f'{"Benchmark":28s} {"items":>9s} {"seconds":>9s} {"rate, items/s":>15s} {"peak, MB":>9s}')
+    for res in results:
+        print(f"{res['name']:28s} {res['items']:9d} {res['seconds']:9.3f} {res['rate']:15,.0f} {res['peak_mb']:9.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark suite of ciscocfg and cdp parsers')
+    parser.add_argument('--devices', type=int, default=20, help='number of generated devices')
+    parser.add_argument('--interfaces', type=int, default=400, help='L3 interfaces of every device')
+    parser.add_argument('--workers', type=int, default=1, help='run ListDevices also with pool of workers')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of every benchmark, the best time is used')
+    parser.add_argument('--json', help='save results to json file')
+    parser.add_argument('--baseline', help='compare results with json file of baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed part of regression')
+    args = parser.parse_args(argv)
+    results = run_suite(args.devices, args.interfaces, args.workers, args.repeat)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as output_f:
+            json.dump(results, output_f, indent=2)
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as input_f:
+            regressions = compare(results, json.load(input_f), args.tolerance)
+        for text in regressions:
+            print(f'REGRESSION {text}')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Generator of synthetic IOS configurations and cdp outputs
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Generator of synthetic IOS configurations ('show run') with L3 interfaces, subinterfaces,
+HSRP, VLAN ranges, L2 ports and bulk ACLs, and outputs of 'show cdp neighbor detail'
+of the same devices (neighbours are connected by their L2 ports).
+Usage: python -m akarlibs.benchmarks.synth <out_dir> [devices] [interfaces]
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import os
+import random
+import sys
+
+PLATFORMS = ('WS-C3750X-48P', 'WS-C2960X-48FPD-L', 'C9300-48P', 'ISR4331/K9', 'N9K-C93180YC-EX')
+
+
+class SynthConfig():
+    """[Class SynthConfig]
+
+    Sizes of generated configuration, every device gets the same sizes with own addresses
+    """
+
+    def __init__(self, interfaces=100, subinterfaces=50, l2_ports=48, vlans=200, acls=4, acl_entries=250, neighbours=4, seed=1):
+        self.interfaces = interfaces
+        self.subinterfaces = subinterfaces
+        self.l2_ports = l2_ports
+        self.vlans = vlans
+        self.acls = acls
+        self.acl_entries = acl_entries
+        self.neighbours = neighbours
+        self.seed = seed
+
+
+def hostname(num):
+    return f'SW{num:05d}'
+
+
+def l2_port(num):
+    return f'GigabitEthernet1/0/{num + 1}'
+
+
+def _vlan_ranges(rnd, count):
+    """
+    Returns text of VLAN list with ranges, e.g. '10-20,25,100-140'
+    """
+    vlans = sorted(rnd.sample(range(2, 4000), count))
+    if not vlans:
+        return []
+    resp = []
+    start = prev = vlans[0]
+    for vlan in vlans[1:] + [None]:
+        if vlan is not None and vlan == prev + 1:
+            prev = vlan
+            continue
+        resp.append(f'{start}' if start == prev else f'{start}-{prev}')
+        if vlan is not None:
+            start = prev = vlan
+    return resp
+
+
+def generate_config(num, sizes):
+    """
+    Returns list of lines of configuration of device num
+    """
+    rnd = random.Random(sizes.seed * 100003 + num)
+    name = hostname(num)
+    lines = [f'{name}#show running-config', 'Building configuration...', '', 'Current configuration : 123456 bytes', '!',
+             'version 15.2', 'service timestamps log datetime msec', f'hostname {name}', '!',
+             'banner motd ^C', f'  {name} - authorized access only', '  interface text inside banner', '^C', '!']
+    ranges = _vlan_ranges(rnd, sizes.vlans)
+    for pos in range(0, len(ranges), 20):
+        lines.append(f'vlan {",".join(ranges[pos:pos + 20])}')
+    lines.append('!')
+    for vlan in rnd.sample(range(2, 4000), min(20, sizes.vlans)):
+        lines += [f'vlan {vlan}', f' name VLAN_{vlan}_{name}', '!']
+    octet2 = num % 250
+    octet1 = 10 + num // 250
+    for intf in range(sizes.interfaces):
+        net = f'{octet1}.{octet2}.{intf % 256}'
+        lines += [f'interface TenGigabitEthernet1/{intf // 48}/{intf % 48 + 1}' if intf % 5 else f'interface Vlan{100 + intf}',
+                  f' description uplink {intf} to core, {name}',
+                  f' vrf forwarding VRF{intf % 8}' if intf % 3 else ' ip vrf forwarding MGMT',
+                  f' ip address {net}.1 255.255.255.0']
+        if intf % 4 == 0:
+            lines.append(f' ip address 172.{16 + intf % 16}.{octet2}.{intf % 254 + 1} 255.255.255.255 secondary')
+        if intf % 2 == 0:
+            lines += [f' standby {intf % 255 + 1} ip {net}.254', f' standby {intf % 255 + 1} priority {100 + intf % 50}', f' standby {intf % 255 + 1} preempt']
+        if sizes.acls:
+            lines.append(f' ip access-group ACL_{intf % sizes.acls} in')
+        lines += [' ip helper-address 10.255.0.1', ' ip helper-address 10.255.0.2', ' no ip redirects', ' shutdown' if intf % 7 == 0 else ' no shutdown', '!']
+    for sub in range(sizes.subinterfaces):
+        lines += [f'interface GigabitEthernet0/0.{sub + 100}', f' description subif {sub}', f' encapsulation dot1Q {sub + 100}',
+                  f' ip address 192.168.{sub % 256}.{1 + (num % 63) * 4} 255.255.255.252', '!']
+    for port in range(sizes.l2_ports):
+        lines += [f'interface {l2_port(port)}', f' description user port {port}']
+        if port < sizes.neighbours:
+            lines += [' switchport trunk encapsulation dot1q', ' switchport mode trunk',
+                      f' switchport trunk allowed vlan {",".join(ranges[:5])}', f' switchport trunk allowed vlan add {",".join(ranges[5:10]) or "1"}',
+                      ' channel-group 1 mode active']
+        else:
+            lines += [f' switchport access vlan {rnd.choice(ranges[0].split("-")) if ranges else 1}', ' switchport mode access',
+                      ' spanning-tree portfast', ' spanning-tree bpduguard enable', ' speed 1000']
+        lines += [' no shutdown', '!']
+    lines += ['router ospf 1', f' router-id {octet1}.{octet2}.255.1', f' network {octet1}.{octet2}.0.0 0.0.255.255 area 0', '!']
+    for acl in range(sizes.acls):
+        lines.append(f'ip access-list extended ACL_{acl}')
+        for entry in range(sizes.acl_entries):
+            proto = rnd.choice(('tcp', 'udp'))
+            lines.append(f' {(entry + 1) * 10} {rnd.choice(("permit", "permit", "deny"))} {proto} {rnd.randint(1, 223)}.{rnd.randint(0, 255)}.0.0 0.0.255.255'
+                         f' host 10.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)} eq {rnd.randint(1, 65535)}')
+        lines += [' deny ip any any log', '!']
+    for entry in range(sizes.acl_entries):
+        lines.append(f'access-list 100 permit ip 10.{entry % 256}.0.0 0.0.255.255 any')
+    lines += ['!', 'line vty 0 4', ' transport input ssh', '!', 'end']
+    return lines
+
+
+def neighbours_of(num, devices, sizes):
+    """
+    Returns list of (local port, neighbour, remote port): device num is connected to the next
+    devices by its first L2 ports, the same link is seen from both sides
+    """
+    resp = []
+    half = sizes.neighbours // 2
+    for step in range(1, half + 1):
+        resp.append((l2_port(step - 1), (num + step) % devices, l2_port(half + step - 1)))
+        resp.append((l2_port(half + step - 1), (num - step) % devices, l2_port(step - 1)))
+    return [(local, peer, remote) for (local, peer, remote) in resp if peer != num]
+
+
+def generate_cdp(num, devices, sizes):
+    """
+    Returns text of 'show cdp neighbor detail' of device num
+    """
+    rnd = random.Random(sizes.seed * 100019 + num)
+    lines = [f'{hostname(num)}#show cdp neighbors detail']
+    for (local, peer, remote) in neighbours_of(num, devices, sizes):
+        lines += ['-------------------------', f'Device ID: {hostname(peer)}.example.com', 'Entry address(es): ',
+                  f'  IP address: {10 + peer // 250}.{peer % 250}.255.1',
+                  f'Platform: cisco {rnd.choice(PLATFORMS)},  Capabilities: Router Switch IGMP ',
+                  f'Interface: {local},  Port ID (outgoing port): {remote}', 'Holdtime : 137 sec', '',
+                  'Version :', 'Cisco IOS Software, C3750E Software (C3750E-UNIVERSALK9-M), Version 15.2(4)E10, RELEASE SOFTWARE (fc2)',
+                  'Technical Support: http://www.cisco.com/techsupport', 'Copyright (c) 1986-2020 by Cisco Systems, Inc.', '',
+                  'advertisement version: 2', 'VTP Management Domain: \'\'', 'Native VLAN: 1', 'Duplex: full',
+                  'Management address(es): ', f'  IP address: {10 + peer // 250}.{peer % 250}.255.1', '']
+    lines.append(f'Total cdp entries displayed : {len(neighbours_of(num, devices, sizes))}')
+    return lines
+
+
+def write_estate(out_dir, devices=10, sizes=None):
+    """
+    Writes <hostname>-config.txt and <hostname>-cdp.txt of devices to out_dir,
+    returns tuple (glob of configurations, glob of cdp files)
+    """
+    sizes = sizes if sizes is not None else SynthConfig()
+    if not os.path.exists(f'{out_dir}'):
+        os.makedirs(f'{out_dir}')
+    for num in range(devices):
+        with open(f'{out_dir}/{hostname(num).lower()}-config.txt', 'w') as output_f:
+            output_f.write('\n'.join(generate_config(num, sizes)) + '\n')
+        with open(f'{out_dir}/{hostname(num).lower()}-cdp.txt', 'w') as output_f:
+            output_f.write('\n'.join(generate_cdp(num, devices, sizes)) + '\n')
+    return f'{out_dir}/*-config.txt', f'{out_dir}/*-cdp.txt'
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    write_estate(sys.argv[1], *[int(arg) for arg in sys.argv[2:3]],
+                 sizes=SynthConfig(interfaces=int(sys.argv[3])) if len(sys.argv) > 3 else None)
@@ -3,17 +3,76 @@
 It requires 'show cdp neighbor detail' output
 """
 
+import functools
 import json
 import re
 
-_KEYS = {
-    'device_id': 'Device ID:',
-    'ip_address': r'(?:IP address|IPv4 Address):',
-    'platform': r'Platform: (?:cisco)?',
-    'capabilities': 'Capabilities:',
-    'local_port': 'Interface:',
-    'remote_port': r'Port ID \(outgoing port\):',
-}
+# Labels of keys as plain text, searched by str.find: value is text after the first label of key till end of line
+_LABELS = (
+    ('device_id', ('Device ID:',)),
+    ('ip_address', ('IP address:', 'IPv4 Address:')),
+    ('platform', ('Platform: ',)),
+    ('capabilities', ('Capabilities:',)),
+    ('local_port', ('Interface:',)),
+    ('remote_port', ('Port ID (outgoing port):',)),
+)
+
+
+def extract_properties(block):
+    """
+    Returns dictionary {key: value} of block: text after the first label of key
+    (and after 'cisco' for platform) till end of line and before ','
+    """
+    resp = dict()
+    for (key, labels) in _LABELS:
+        first = len(block)
+        start = None
+        for label in labels:
+            pos = block.find(label)
+            if 0 <= pos < first:
+                first = pos
+                start = pos + len(label)
+        if start is None:
+            resp[key] = None
+            continue
+        if key == 'platform' and block.startswith('cisco', start):
+            start += 5
+        if block[start:start + 1].isspace():
+            start += 1
+        end = block.find('\n', start)
+        resp[key] = block[start:end if end >= 0 else len(block)].split(',', 1)[0].strip()
+    return resp
+
+
+@functools.lru_cache(maxsize=8192)
+def shorten_interface(port, length=2):
+    """
+    Shortens the Interface Description: GigabitEthernet1/0/1 -> Gi1/0/1.
+    Results are cached, the same ports are repeated in cdp entries and configurations
+    """
+    prefix_re = r'^\w{%s}' % length
+    prefix = re.search(prefix_re, port).group(0)
+    suffix = re.search(r'\d.*$', port).group(0)
+    return '{0}{1}'.format(prefix, suffix)
+
+
+def split_blocks(cdp_input):
+    """
+    Splits output to blocks of entries by separator lines ('-----...'), one pass over lines.
+    Text before the first separator and blank blocks are skipped
+    """
+    blocks = []
+    block = None
+    for line in cdp_input.splitlines():
+        if '-----' in line and not line.strip().strip('-'):
+            if block:
+                blocks.append('\n'.join(block))
+            block = []
+        elif block is not None and (block or line.strip()):
+            block.append(line)
+    if block:
+        blocks.append('\n'.join(block))
+    return blocks
 
 
 class CDPEntry():
@@ -46,6 +105,15 @@ class CDPEntry():
         '''
         return self.shorten_interface(self.remote_port)
 
+    @property
+    def fingerprint(self):
+        '''
+        returns tuple (device_id without domain, local_port, remote_port) of the adjacency or None if fields are missing
+        '''
+        if not self.device_id or not self.local_port or not self.remote_port:
+            return None
+        return (self.remove_domain(), self.local_port, self.remote_port)
+
     @property
     def dict(self):
         '''
@@ -83,29 +151,13 @@ class CDPEntry():
         '''
         return json.dumps(self.dict)
 
-    @staticmethod
-    def _extract_keys(pattern, string):
-        res = re.search(r'{}\s?(.*)'.format(pattern), string)
-        if res:
-            return res.group(1).split(',')[0].strip()
-        return None
-
-    @staticmethod
-    def shorten_interface(port, length=2):
-        """
-        Shortens the Interface Description.
-        """
-        prefix_re = r'^\w{%s}' % length
-        prefix = re.search(prefix_re, port).group(0)
-        suffix = re.search(r'\d.*$', port).group(0)
-        return '{0}{1}'.format(prefix, suffix)
+    shorten_interface = staticmethod(shorten_interface)
 
     def get_all_properties(self, block):
         """
         This method takes in a block and extract out of it the values
         """
-        for key, val in _KEYS.items():
-            self.__dict__[key] = self._extract_keys(val, block)
+        self.__dict__.update(extract_properties(block))
 
     def remove_domain(self):
         """
@@ -136,6 +188,8 @@ class Device():
     def __init__(self, cdp_input, hostname=None):
         self.hostname = hostname
         self.cdp_entries = []
+        # hash of file of cdp output, set by ciscocfg.parse_cdp_file
+        self.cdp_hash = None
         self.cdp_input = cdp_input
         self._split_to_blocks()
         self._get_all_entries()
@@ -144,7 +198,7 @@ class Device():
         return 'Device: {}'.format(self.hostname)
 
     def _split_to_blocks(self):
-        self.blocks = re.findall(r'-----+((?:.*|\n+)+?)(?:-|$)', self.cdp_input)
+        self.blocks = split_blocks(self.cdp_input)
 
     def _get_all_entries(self):
         for block in self.blocks:
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Changes of cdp neighbours between runs
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Tracker of cdp adjacencies: every cdp.CDPEntry has fingerprint (device_id, local_port, remote_port),
+previous state of every device is kept in json file as hash of fingerprints and entries.
+Devices with the same hash are skipped, only adjacencies of changed devices are compared:
+added, removed and changed (the same neighbour on the same local port with other remote port, platform or address).
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import hashlib
+import json
+import logging
+import os
+import akarlibs.csvexport as csvexport
+from .akarlogging import get_color_logger
+
+
+class AdjacencyChange():
+    """[Class AdjacencyChange]
+
+    Added, removed or changed adjacency of device, old is dictionary of previous values of changed adjacency
+    """
+
+    __slots__ = ('hostname', 'change', 'local_port', 'device_id', 'remote_port', 'platform', 'ip_address', 'old')
+
+    def __init__(self, hostname, change, local_port, device_id, values, old=None):
+        self.hostname = hostname
+        self.change = change
+        self.local_port = local_port
+        self.device_id = device_id
+        (self.remote_port, self.platform, self.ip_address) = values
+        self.old = old
+
+    def __repr__(self):
+        return f'<AdjacencyChange {self.change} {self.hostname} {self.local_port} - {self.device_id} {self.remote_port}>'
+
+    @property
+    def dict(self):
+        resp = {
+            'hostname': self.hostname,
+            'change': self.change,
+            'local_port': self.local_port,
+            'device_id': self.device_id,
+            'remote_port': self.remote_port,
+            'platform': self.platform,
+            'ip_address': self.ip_address,
+            'old': self.old,
+        }
+        return resp
+
+
+class CdpChanges():
+    """[Class CdpChanges]
+
+    Result of one run of CdpTracker: lists of AdjacencyChange and hostnames of devices without changes
+    """
+
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.changed = []
+        self.unchanged = []
+
+    def __repr__(self):
+        return f'<CdpChanges added: {len(self.added)} removed: {len(self.removed)} changed: {len(self.changed)}>'
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __iter__(self):
+        yield from self.removed
+        yield from self.changed
+        yield from self.added
+
+    def to_csv(self, path):
+        """
+        Writes csv file: Hostname;Change;LocalPort;RemoteName;RemotePort;RemotePlatform;RemoteIP;OldRemotePort
+        """
+        rows = ((ch.hostname, ch.change, ch.local_port, ch.device_id, ch.remote_port, ch.platform, ch.ip_address,
+                 ch.old['remote_port'] if ch.old else '') for ch in self)
+        csvexport.write_csv(path, ('Hostname', 'Change', 'LocalPort', 'RemoteName', 'RemotePort', 'RemotePlatform', 'RemoteIP', 'OldRemotePort'), rows)
+
+
+def device_adjacencies(device):
+    """
+    Returns dictionary {'local_port|device_id': [remote_port, platform, ip_address]} of cdp.Device
+    """
+    resp = dict()
+    for entry in device.cdp_entries:
+        fingerprint = entry.fingerprint
+        if fingerprint is None:
+            continue
+        (device_id, local_port, remote_port) = fingerprint
+        resp[f'{local_port}|{device_id}'] = [remote_port, entry.platform, entry.ip_address]
+    return resp
+
+
+def adjacencies_hash(adjacencies):
+    return hashlib.blake2b(json.dumps(sorted(adjacencies.items())).encode(), digest_size=16).hexdigest()
+
+
+class CdpTracker():
+    """[Class CdpTracker]
+
+    Keeps state {hostname: {'hash': hash, 'adjacencies': device_adjacencies}} of the previous run in state_file
+    (only in memory if state_file is None). update returns CdpChanges of devices against previous state.
+    """
+
+    def __init__(self, state_file='cdp_state.json', dbg=logging.INFO):
+        self.__logger = get_color_logger("CdpTracker", dbg)
+        self.state_file = state_file
+        self.state = dict()
+        if state_file and os.path.exists(state_file):
+            with open(state_file) as input_f:
+                self.state = json.load(input_f)
+
+    def update(self, devices_cdp, full=False):
+        """
+        Compares devices (cdp.Device) with previous state and saves new state.
+        With full=True devices of previous state missing in devices_cdp are removed with all adjacencies
+        """
+        resp = CdpChanges()
+        seen = set()
+        for device in devices_cdp:
+            if not device.hostname:
+                continue
+            seen.add(device.hostname)
+            adjacencies = device_adjacencies(device)
+            digest = adjacencies_hash(adjacencies)
+            prev = self.state.get(device.hostname)
+            if prev is not None and prev['hash'] == digest:
+                resp.unchanged.append(device.hostname)
+                continue
+            self._compare(resp, device.hostname, prev['adjacencies'] if prev is not None else dict(), adjacencies)
+            self.state[device.hostname] = {'hash': digest, 'adjacencies': adjacencies}
+        if full:
+            for hostname in [host for host in self.state if host not in seen]:
+                self._compare(resp, hostname, self.state.pop(hostname)['adjacencies'], dict())
+        self.__logger.info(f'Devices: {len(seen)} unchanged: {len(resp.unchanged)} adjacencies added: {len(resp.added)} '
+                           f'removed: {len(resp.removed)} changed: {len(resp.changed)}')
+        if self.state_file:
+            self.save()
+        return resp
+
+    @staticmethod
+    def _compare(resp, hostname, old, new):
+        for key, values in new.items():
+            (local_port, device_id) = key.split('|', 1)
+            if key not in old:
+                resp.added.append(AdjacencyChange(hostname, 'added', local_port, device_id, values))
+            elif old[key] != values:
+                resp.changed.append(AdjacencyChange(hostname, 'changed', local_port, device_id, values,
+                                                    old=dict(zip(('remote_port', 'platform', 'ip_address'), old[key]))))
+        for key, values in old.items():
+            if key not in new:
+                (local_port, device_id) = key.split('|', 1)
+                resp.removed.append(AdjacencyChange(hostname, 'removed', local_port, device_id, values))
+
+    def save(self):
+        # state file is replaced at once, the previous state is kept if writing fails
+        with open(f'{self.state_file}.tmp', 'w') as output_f:
+            json.dump(self.state, output_f)
+        os.replace(f'{self.state_file}.tmp', self.state_file)
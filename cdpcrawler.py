@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Discovery of network by cdp neighbours using Nornir
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Crawler of network on top of AlexNornir: starts from seed devices of inventory, runs 'show cdp nei deta'
+on all devices of current frontier by Nornir with num_workers threads, parses outputs by cdp.Device and adds
+management addresses of new neighbours to inventory as the next frontier.
+Neighbours are deduplicated by name (Device ID without domain) and by address.
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import logging
+import os
+import re
+from nornir.plugins.tasks.networking import netmiko_send_command
+import akarlibs.ciscocfg as ciscocfg
+import akarlibs.topology as topology
+from .akarlogging import get_color_logger
+
+CDP_COMMAND = 'show cdp nei deta'
+
+
+class CdpCrawler():
+    """[Class CdpCrawler]
+
+    Discovery of devices by cdp. alex_nornir is AlexNornir, hosts of its inventory (filtered) are seeds.
+    New hosts are added to inventory with name = Device ID and hostname = management address,
+    connection parameters (platform, username, password, port) are taken from the first seed.
+    Only neighbours with capabilities from capabilities and platform matching platforms (regex) are crawled.
+    self.devices - {name: cdp.Device}, self.addresses - {name: address}, self.depth - {name: frontier number},
+    self.errors - list of (name, error)
+    """
+
+    def __init__(self, alex_nornir, workers=20, max_depth=None, max_devices=None, capabilities=('Router', 'Switch'), platforms=None,
+                 out_dir=None, dbg=logging.INFO):
+        self.__logger = get_color_logger("CdpCrawler", dbg)
+        self._nor = alex_nornir.nor
+        self.workers = workers
+        self.max_depth = max_depth
+        self.max_devices = max_devices
+        self.capabilities = capabilities
+        self._re_platforms = re.compile(platforms) if platforms else None
+        self.out_dir = out_dir
+        self.devices = dict()
+        self.addresses = dict()
+        self.depth = dict()
+        self.errors = []
+        # names are compared in lower case, Device ID and name in inventory can differ in case
+        self._seen_names = set()
+        self._seen_addresses = set()
+        seeds = list(self._nor.inventory.hosts.values())
+        self._host_params = dict()
+        if seeds:
+            self._host_params = {'platform': seeds[0].platform, 'username': seeds[0].username, 'password': seeds[0].password, 'port': seeds[0].port}
+        for host in seeds:
+            self._add_seen(host.name, host.hostname, 0)
+
+    def _add_seen(self, name, address, depth):
+        self.addresses[name] = address
+        self.depth[name] = depth
+        self._seen_names.add(name.lower())
+        if address:
+            self._seen_addresses.add(address)
+
+    def _is_wanted(self, entry):
+        if not entry.device_id or not entry.ip_address:
+            return False
+        if self.capabilities and not any(cap in (entry.capabilities or '') for cap in self.capabilities):
+            return False
+        if self._re_platforms is not None and not self._re_platforms.search(entry.platform or ''):
+            return False
+        return True
+
+    def _queue_neighbours(self, device, depth):
+        """
+        Returns list of names of new neighbours of device, they are added to inventory
+        """
+        resp = []
+        for entry in device.cdp_entries:
+            if not self._is_wanted(entry):
+                continue
+            name = entry.remove_domain()
+            if name.lower() in self._seen_names or entry.ip_address in self._seen_addresses:
+                continue
+            if self.max_devices is not None and len(self.depth) >= self.max_devices:
+                break
+            self._nor.inventory.add_host(name, hostname=entry.ip_address, **self._host_params)
+            self._add_seen(name, entry.ip_address, depth)
+            resp.append(name)
+        return resp
+
+    def _save(self, name, text):
+        if not os.path.exists(f'{self.out_dir}'):
+            os.makedirs(f'{self.out_dir}')
+        with open(f'{self.out_dir}/{name.lower()}-cdp.txt', 'w') as output_f:
+            output_f.write(text)
+
+    def crawl_frontier(self, frontier, depth):
+        """
+        Runs cdp command on hosts of frontier, returns list of names of new neighbours (the next frontier)
+        """
+        names = set(frontier)
+        nor = self._nor.filter(filter_func=lambda host: host.name in names)
+        res = nor.run(task=netmiko_send_command, command_string=CDP_COMMAND, name=CDP_COMMAND, num_workers=max(1, min(self.workers, len(names))))
+        nor.close_connections(on_good=True, on_failed=True)
+        resp = []
+        for name in frontier:
+            if name not in res or res[name].failed:
+                exc = res[name][0].exception if name in res else None
+                error = f'{type(exc).__name__}: {exc}' if exc is not None else 'Task failed'
+                self.__logger.error(f'Host: {name} Address: {self.addresses.get(name)} Error: {error}')
+                self.errors.append((name, error))
+                continue
+            text = f'{name}#{CDP_COMMAND}\n{res[name][0].result}\n'
+            (device, error) = ciscocfg.parse_cdp_text(text)
+            if error is not None:
+                self.__logger.error(f'Host: {name} Error: {error}')
+                self.errors.append((name, error))
+                continue
+            self.devices[name] = device
+            if self.out_dir:
+                self._save(name, text)
+            resp.extend(self._queue_neighbours(device, depth + 1))
+        return resp
+
+    def run(self):
+        """
+        Crawls network from seeds frontier by frontier, returns self.devices
+        """
+        frontier = sorted(self.depth)
+        depth = 0
+        while frontier:
+            self.__logger.info(f'Frontier: {depth} hosts: {len(frontier)} discovered: {len(self.depth)}')
+            frontier = self.crawl_frontier(frontier, depth)
+            depth += 1
+            if self.max_depth is not None and depth > self.max_depth:
+                break
+        self.__logger.info(f'Crawled devices: {len(self.devices)} errors: {len(self.errors)} not crawled: {len(frontier)}')
+        return self.devices
+
+    def topology(self):
+        """
+        Returns topology.Topology of crawled devices
+        """
+        return topology.Topology(self.devices.values())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Section aware diff of snapshots of cisco configurations
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Diff of configurations by top level blocks (interface, router, vlan, ...) parsed by cfgtree.
+Every block is hashed, blocks with the same line and hash are skipped without comparison,
+lines are compared only for changed blocks. Files with the same hash are skipped without parsing.
+Snapshots are directories with '<host>-config.txt' files written by AlexNornir.get_config.
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import difflib
+import glob
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+import akarlibs.csvexport as csvexport
+from .akarlogging import get_color_logger
+from .cfgtree import iter_blocks
+from .parsecache import file_digest
+
+SNAPSHOT_SUFFIX = '-config.txt'
+
+
+def config_blocks(config_input):
+    """
+    Returns dictionary {top level line: (hash, lines of block)} of configuration (file or list of lines).
+    Blocks with the same top level line are joined
+    """
+    blocks = dict()
+    for block in iter_blocks(config_input):
+        lines = [block.text] + [child.text for child in block.all_children]
+        if block.text in blocks:
+            lines = blocks[block.text][1] + lines
+        blocks[block.text] = (hashlib.blake2b('\n'.join(lines).encode(errors='replace'), digest_size=16).digest(), lines)
+    return blocks
+
+
+def section_of(block_line):
+    """
+    Section of block is the first word of top level line: interface, router, vlan, ...
+    """
+    words = block_line.split(None, 1)
+    return words[0] if words else ''
+
+
+class ConfigDiff():
+    """[Class ConfigDiff]
+
+    Difference of two configurations of device: added, removed and changed top level blocks
+    """
+
+    __slots__ = ('hostname', 'file_old', 'file_new', 'added', 'removed', 'changed', 'lines_old', 'lines_new')
+
+    def __init__(self, hostname, file_old=None, file_new=None):
+        self.hostname = hostname
+        self.file_old = file_old
+        self.file_new = file_new
+        self.added = []
+        self.removed = []
+        self.changed = []
+        # top level line: lines of block, only for added, removed and changed blocks
+        self.lines_old = dict()
+        self.lines_new = dict()
+
+    def __repr__(self):
+        return f'<ConfigDiff {self.hostname} added: {len(self.added)} removed: {len(self.removed)} changed: {len(self.changed)}>'
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    @property
+    def dict(self):
+        return {
+            'hostname': self.hostname,
+            'file_old': self.file_old,
+            'file_new': self.file_new,
+            'added': self.added,
+            'removed': self.removed,
+            'changed': self.changed,
+        }
+
+    def sections(self):
+        """
+        Returns dictionary {section: {'added': count, 'removed': count, 'changed': count}}
+        """
+        resp = dict()
+        for change in ('added', 'removed', 'changed'):
+            for block_line in getattr(self, change):
+                counts = resp.setdefault(section_of(block_line), {'added': 0, 'removed': 0, 'changed': 0})
+                counts[change] += 1
+        return resp
+
+    def unified(self, context=1):
+        """
+        Returns unified diff of changed, removed and added blocks as text
+        """
+        resp = []
+        for block_line in self.removed + self.changed + self.added:
+            resp.extend(difflib.unified_diff(self.lines_old.get(block_line, []), self.lines_new.get(block_line, []),
+                                             f'{self.file_old}', f'{self.file_new}', n=context, lineterm=''))
+        return '\n'.join(resp)
+
+
+def diff_configs(config_old, config_new, hostname=None):
+    """
+    Returns ConfigDiff of two configurations (files or lists of lines)
+    """
+    blocks_old = config_blocks(config_old) if config_old is not None else dict()
+    blocks_new = config_blocks(config_new) if config_new is not None else dict()
+    resp = ConfigDiff(hostname, config_old if isinstance(config_old, str) else None, config_new if isinstance(config_new, str) else None)
+    for block_line, (digest, lines) in blocks_old.items():
+        if block_line not in blocks_new:
+            resp.removed.append(block_line)
+            resp.lines_old[block_line] = lines
+        elif blocks_new[block_line][0] != digest:
+            resp.changed.append(block_line)
+            resp.lines_old[block_line] = lines
+            resp.lines_new[block_line] = blocks_new[block_line][1]
+    for block_line, (_digest, lines) in blocks_new.items():
+        if block_line not in blocks_old:
+            resp.added.append(block_line)
+            resp.lines_new[block_line] = lines
+    return resp
+
+
+def diff_files(file_old, file_new, hostname=None):
+    """
+    Returns ConfigDiff of two files, files with the same hash are not parsed.
+    file_old or file_new can be None for new or removed device
+    """
+    if file_old is not None and file_new is not None and file_digest(file_old) == file_digest(file_new):
+        return ConfigDiff(hostname, file_old, file_new)
+    return diff_configs(file_old, file_new, hostname)
+
+
+def _diff_pair(pair):
+    (hostname, file_old, file_new) = pair
+    try:
+        return diff_files(file_old, file_new, hostname), None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+
+def snapshot_files(snapshot_dir, suffix=SNAPSHOT_SUFFIX):
+    """
+    Returns dictionary {host: file} of snapshot directory
+    """
+    return {os.path.basename(file_name)[:-len(suffix)]: file_name for file_name in glob.glob(f'{snapshot_dir}/*{suffix}')}
+
+
+class SnapshotDiff():
+    """[Class SnapshotDiff]
+
+    Diff of all devices of two snapshot directories, pairs of files are compared by pool of processes if workers > 1.
+    self.diffs - ConfigDiff of devices with changes, self.unchanged - hosts without changes,
+    self.errors - list of (host, error)
+    """
+
+    def __init__(self, dir_old, dir_new, suffix=SNAPSHOT_SUFFIX, workers=1, dbg=logging.INFO):
+        self.__logger = get_color_logger("SnapshotDiff", dbg)
+        self.dir_old = dir_old
+        self.dir_new = dir_new
+        self.diffs = []
+        self.unchanged = []
+        self.errors = []
+        files_old = snapshot_files(dir_old, suffix)
+        files_new = snapshot_files(dir_new, suffix)
+        pairs = [(host, files_old.get(host), files_new.get(host)) for host in sorted(set(files_old) | set(files_new))]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_diff_pair, pairs, chunksize=max(1, len(pairs) // (workers * 4))))
+        else:
+            results = [_diff_pair(pair) for pair in pairs]
+        for (host, _file_old, _file_new), (diff, error) in zip(pairs, results):
+            if error is not None:
+                self.__logger.error(f'Host: {host} Error: {error}')
+                self.errors.append((host, error))
+            elif diff:
+                self.diffs.append(diff)
+            else:
+                self.unchanged.append(host)
+        self.__logger.info(f'Compared devices: {len(pairs)} changed: {len(self.diffs)} unchanged: {len(self.unchanged)}')
+
+    def sections(self):
+        """
+        Returns dictionary {section: {'added': count, 'removed': count, 'changed': count}} of all devices
+        """
+        resp = dict()
+        for diff in self.diffs:
+            for section, counts in diff.sections().items():
+                total = resp.setdefault(section, {'added': 0, 'removed': 0, 'changed': 0})
+                for change, count in counts.items():
+                    total[change] += count
+        return resp
+
+    def to_csv(self, path):
+        """
+        Writes csv file: Hostname;Section;Block;Change
+        """
+        rows = ((diff.hostname, section_of(block_line), block_line, change)
+                for diff in self.diffs for change in ('added', 'removed', 'changed') for block_line in getattr(diff, change))
+        csvexport.write_csv(path, ('Hostname', 'Section', 'Block', 'Change'), rows)
+
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Indentation based parser for cisco configuration
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Indentation based parser for cisco configuration.
+Builds parent/child tree of configuration lines in one pass over the file.
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import re
+import akarlibs.archives as archives
+
+_RE_BANNER = re.compile(r'^banner\s+\S+\s*(\^C|\S)(.*)$')
+
+
+class ConfigLine():
+    """[Class ConfigLine]
+
+    One line of configuration with its children
+    """
+
+    __slots__ = ('text', 'linenum', 'indent', 'children')
+
+    def __init__(self, text, linenum, indent):
+        self.text = text
+        self.linenum = linenum
+        self.indent = indent
+        self.children = []
+
+    def __repr__(self):
+        return f'<ConfigLine # {self.linenum} {self.text!r}>'
+
+    @property
+    def all_children(self):
+        resp = []
+        for child in self.children:
+            resp.append(child)
+            resp.extend(child.all_children)
+        return resp
+
+    def re_search_children(self, regex):
+        """
+        Returns list of direct children which text matches regex
+        """
+        if isinstance(regex, str):
+            regex = re.compile(regex)
+        return [child for child in self.children if regex.search(child.text)]
+
+
+class ConfigTree():
+    """[Class ConfigTree]
+
+    Parsed configuration: list of top level lines with their children.
+    Input is name of file or list of lines.
+    """
+
+    def __init__(self, config_input):
+        self.roots = list(iter_blocks(config_input))
+
+
+def _iter_lines(config_input):
+    if isinstance(config_input, str) and archives.split_label(config_input) is not None:
+        # member of archive: ListDevices names it '<archive>::<member>' in file_input
+        yield from archives.read_member(config_input).decode(errors='replace').splitlines()
+    elif isinstance(config_input, str):
+        with open(config_input, errors='replace') as input_f:
+            yield from input_f
+    else:
+        yield from config_input
+
+
+def iter_blocks(config_input, keep=None):
+    """
+    Yields top level lines of configuration one by one, each one with all its children.
+    Blank lines and comments ('!') are skipped, text of banner is kept as children of banner line.
+    With keep (tuple of prefixes) only blocks which top level line starts with one of prefixes
+    are built, other blocks are skipped while reading, so memory is used only for one block.
+    """
+    root = None
+    skip_indent = None
+    stack = []
+    lines = enumerate(_iter_lines(config_input))
+    for linenum, line in lines:
+        text = line.rstrip()
+        stripped = text.lstrip()
+        if not stripped or stripped[0] == '!':
+            continue
+        indent = len(text) - len(stripped)
+        if skip_indent is not None:
+            if indent > skip_indent:
+                continue
+            skip_indent = None
+        while stack and stack[-1].indent >= indent:
+            stack.pop()
+        if not stack:
+            if root is not None:
+                yield root
+                root = None
+            if keep is not None and not stripped.startswith(keep):
+                skip_indent = indent
+                for _banner_line in _iter_banner(stripped, lines):
+                    pass
+                continue
+            root = obj = ConfigLine(text, linenum, indent)
+        else:
+            obj = ConfigLine(text, linenum, indent)
+            stack[-1].children.append(obj)
+        stack.append(obj)
+        for linenum, text in _iter_banner(stripped, lines):
+            obj.children.append(ConfigLine(text, linenum, indent + 1))
+    if root is not None:
+        yield root
+
+
+def _iter_banner(stripped, lines):
+    """
+    Yields lines of text of banner if line is start of banner, text ends with the same delimiter
+    """
+    res = _RE_BANNER.match(stripped)
+    if res and res.group(1) not in res.group(2):
+        for linenum, line in lines:
+            text = line.rstrip('\r\n')
+            yield linenum, text
+            if res.group(1) in text:
+                break
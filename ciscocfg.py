@@ -14,13 +14,21 @@ version: 1.0
 
 import json
 import re
+import sys
 import glob
+import functools
+import collections
+import hashlib
+import io
 import os
 import akarlibs.cdp as cdp
+import akarlibs.csvexport as csvexport
+import akarlibs.archives as archives
+import akarlibs.topology as topology
 import logging
-from ciscoconfparse import CiscoConfParse
-from netaddr import IPAddress, IPNetwork
-from .akarlogging import AkarLogging
+from concurrent.futures import Future, ProcessPoolExecutor
+from .akarlogging import get_color_logger
+from .cfgtree import ConfigTree, iter_blocks
 
 _KEYS_L3_INT = {
     'name': r'^interface',
@@ -55,16 +63,172 @@ _KEYS_VLAN = {
     'name': r'^\s*name',
 }
 
+# Literal which must be in the line for the key pattern to match it
+_GATES_L3_INT = {
+    'name': 'interface',
+    'desc': 'description',
+    'subint': 'interface',
+    'vrf': 'forwarding',
+    'status': 'shutdown',
+    'access_list': 'access-group',
+    'ipv4': 'address',
+    'ipv4_sec': 'secondary',
+    'hsrp_num': 'standby',
+    'hsrp_ip': 'standby',
+    'hsrp_pri': 'standby',
+    'ip_helper': 'helper-address',
+}
+
+_GATES_L2_INT = {
+    'name': 'interface',
+    'desc': 'description',
+    'mode': 'switchport',
+    'status': 'shutdown',
+    'access_vlan': 'switchport',
+    'trunk_allowed': 'switchport',
+    'channel_group': 'channel-group',
+    'channel_mode': 'channel-group',
+    'span_tree': 'spanning-tree',
+    'speed': 'speed',
+}
+
+_GATES_VLAN = {
+    'vlan': 'vlan',
+    'name': 'name',
+}
+
+
+def ipv4_to_int(addr):
+    (oct1, oct2, oct3, oct4) = addr.split('.')
+    return (int(oct1) << 24) | (int(oct2) << 16) | (int(oct3) << 8) | int(oct4)
+
+
+def int_to_ipv4(num):
+    return f'{num >> 24}.{(num >> 16) & 255}.{(num >> 8) & 255}.{num & 255}'
+
+
+def prefix_to_netmask(prefixlen):
+    return (0xffffffff << (32 - prefixlen)) & 0xffffffff
+
+
+def netmask_bits(mask):
+    """
+    Returns prefix length of netmask, 32 if mask is not contiguous (as netaddr does)
+    """
+    hostmask = ~mask & 0xffffffff
+    if hostmask & (hostmask + 1):
+        return 32
+    return 32 - hostmask.bit_length()
+
+
+# All VLANs which can be used on trunk: 1-4094
+VLAN_ALL = ((1 << 4095) - 1) & ~1
+
+
+def vlan_list_to_bits(vlan_list):
+    """
+    Returns bitset (int, bit N is VLAN N) of list of VLANs like '1-5,10,200-205'
+    """
+    bits = 0
+    for vl in vlan_list.split(','):
+        vl = vl.strip()
+        if vl.isdigit():
+            bits |= 1 << int(vl)
+        elif vl:
+            (ib, ie) = vl.split('-')
+            bits |= ((1 << (int(ie) + 1)) - 1) & ~((1 << int(ib)) - 1)
+    return bits
+
+
+def bits_to_vlans(bits):
+    """
+    Returns sorted list of VLANs of bitset
+    """
+    resp = []
+    while bits:
+        low = bits & -bits
+        resp.append(low.bit_length() - 1)
+        bits ^= low
+    return resp
+
+
+def trunk_allowed_bits(bits, allowed):
+    """
+    Applies line 'switchport trunk allowed vlan <allowed>' to bitset of allowed VLANs
+    """
+    tokens = allowed.split()
+    if not tokens:
+        return bits
+    if tokens[0] == 'all':
+        return VLAN_ALL
+    if tokens[0] == 'none':
+        return 0
+    if tokens[0] in ('add', 'remove', 'except') and len(tokens) > 1:
+        vlans = vlan_list_to_bits(''.join(tokens[1:]))
+        if tokens[0] == 'add':
+            return bits | vlans
+        if tokens[0] == 'remove':
+            return bits & ~vlans
+        return VLAN_ALL & ~vlans
+    return vlan_list_to_bits(''.join(tokens))
+
+
+class KeyMatcher():
+    """[Class KeyMatcher]
+
+    Table of keys compiled once. The line is scanned one time for literals of all keys,
+    then only patterns of the keys which literals were found are checked.
+    Result is the same as re.search(r'{}\s?(.*)'.format(pattern), line) for every key of the table.
+    """
+
+    def __init__(self, keys, gates, flags=0):
+        self._dispatch = dict()
+        for key, pattern in keys.items():
+            self._dispatch.setdefault(gates[key], []).append((key, re.compile(r'{}\s?(.*)'.format(pattern), flags)))
+        self._gates = re.compile('|'.join(re.escape(gate) for gate in sorted(self._dispatch, key=len, reverse=True)))
+
+    def match(self, line):
+        """
+        Returns list of tuples (key, match object) for all keys matched the line
+        """
+        resp = []
+        for gate in set(self._gates.findall(line)):
+            for key, regex in self._dispatch[gate]:
+                res = regex.search(line)
+                if res:
+                    resp.append((key, res))
+        return resp
+
+
+# Values repeated on many interfaces, stored once in memory
+_INTERN_L3_INT = frozenset(('status', 'vrf', 'access_list', 'hsrp_num', 'hsrp_pri', 'ip_helper'))
+_INTERN_L2_INT = frozenset(('mode', 'status', 'access_vlan', 'trunk_allowed', 'channel_group', 'channel_mode', 'span_tree', 'speed'))
+
+_MATCHER_L3_INT = KeyMatcher(_KEYS_L3_INT, _GATES_L3_INT)
+_MATCHER_L2_INT = KeyMatcher(_KEYS_L2_INT, _GATES_L2_INT, re.DOTALL)
+_MATCHER_VLAN = KeyMatcher(_KEYS_VLAN, _GATES_VLAN, re.DOTALL)
+
+_RE_HOSTNAME = re.compile(r'^hostname\s+(\S+)')
+# Top level blocks used by CiscoDevice, in streaming mode all other blocks are skipped
+_STREAM_BLOCKS = ('hostname', 'interface', 'vlan')
+_RE_L3_INT_CHILD = re.compile(r'^\s*ip address')
+_RE_L2_INT_CHILD = re.compile(r'^\s*(no)?\s*ip address')
+_RE_VLAN = re.compile(r'^vlan\s*\d+')
+
 
 class L3Interface():
     """[Class L3Interface]
 
+    Argument dbg is kept for compatibility, records don't have own logger
+
     Returns:
         [type] -- [description]
     """
 
+    __slots__ = ('name', 'desc', 'subint', 'status', 'ipv4', 'ipv4_sec', 'net', 'hsrp_num', 'hsrp_ip', 'hsrp_pri', 'ip_helper', 'access_list', 'vrf',
+                 'ipv4_addr', 'ipv4_prefixlen', 'ipv4_sec_addrs')
+
     def __init__(self, dbg=logging.INFO):
-        self.__logger = AkarLogging(dbg, "L3Interface").get_color_logger()
         self.name = ""
         self.desc = ""
         self.subint = ""
@@ -78,28 +242,31 @@ class L3Interface():
         self.ip_helper = ""
         self.access_list = ""
         self.vrf = ""
+        self.ipv4_addr = None
+        self.ipv4_prefixlen = None
+        self.ipv4_sec_addrs = ()
 
     @property
     def dict(self):
+        """
+        Dictionary of interface, built on every call from integer addresses set by calc_prefixes
+        """
         ipv4_w_prf = ""
         ipv4_net_calc = ""
         ipv4_sec_w_prf = ""
-        ipv4_sec_net_calc = ""
-        if self.ipv4 != "":
-            ipv4_w_prf = f'{self.ipv4.split()[0].strip()}/{IPAddress(self.ipv4.split()[1].strip()).netmask_bits()}'
-            ipv4_net_calc = f'{IPNetwork(ipv4_w_prf).network}/{IPAddress(self.ipv4.split()[1].strip()).netmask_bits()}'
-        if self.ipv4_sec != "":
-            ipv4_sec_w_prf = f'{self.ipv4_sec.split()[0].strip()}/{IPAddress(self.ipv4_sec.split()[1].strip()).netmask_bits()}'
-            ipv4_sec_net_calc = f'{IPNetwork(ipv4_sec_w_prf).network}/{IPAddress(self.ipv4_sec.split()[1].strip()).netmask_bits()}'
-
+        if self.ipv4_addr is not None:
+            ipv4_w_prf = f'{int_to_ipv4(self.ipv4_addr)}/{self.ipv4_prefixlen}'
+            ipv4_net_calc = f'{int_to_ipv4(self.ipv4_addr & prefix_to_netmask(self.ipv4_prefixlen))}/{self.ipv4_prefixlen}'
+        if self.ipv4_sec_addrs:
+            ipv4_sec_w_prf = f'{int_to_ipv4(self.ipv4_sec_addrs[0][0])}/{self.ipv4_sec_addrs[0][1]}'
         resp = {
             'name': self.name,
             'desc': self.desc,
             'subint': self.subint,
             'status': self.status,
-            'ipv4': f'{ipv4_w_prf}',
-            'ipv4_net': f'{ipv4_net_calc}',
-            'ipv4_sec': f'{ipv4_sec_w_prf}',
+            'ipv4': ipv4_w_prf,
+            'ipv4_net': ipv4_net_calc,
+            'ipv4_sec': ipv4_sec_w_prf,
             'net': self.net,
             'hsrp_num': self.hsrp_num,
             'hsrp_ip': self.hsrp_ip,
@@ -111,38 +278,62 @@ class L3Interface():
         }
         return resp
 
+    def calc_prefixes(self):
+        """
+        Calculates addresses and prefix lengths of ipv4 and ipv4_sec as integers,
+        called by get_all_properties when ipv4 or ipv4_sec is set
+        """
+        self.ipv4_addr = None
+        self.ipv4_prefixlen = None
+        if self.ipv4 != "":
+            (addr, mask) = self.ipv4.split(',')[0].split()
+            self.ipv4_addr = ipv4_to_int(addr)
+            self.ipv4_prefixlen = netmask_bits(ipv4_to_int(mask))
+        sec_addrs = []
+        if self.ipv4_sec != "":
+            for ipv4_sec in self.ipv4_sec.split(','):
+                (addr, mask) = ipv4_sec.split()
+                sec_addrs.append((ipv4_to_int(addr), netmask_bits(ipv4_to_int(mask))))
+        self.ipv4_sec_addrs = tuple(sec_addrs)
+
     @property
     def json(self):
         return json.dumps(self.dict)
 
-    @staticmethod
-    def _extract_keys(pattern, string):
-        res = re.search(r'{}\s?(.*)'.format(pattern), string)
-        if res:
-            return res.group(1).split(',')[0].strip()
-        return ""
+    @property
+    def name_short(self):
+        """
+        Short name of interface (Gi1/0/1), the same as local_port_short of cdp entries
+        """
+        return cdp.shorten_interface(self.name) if self.name else self.name
 
     def get_all_properties(self, block):
-        for key, val in _KEYS_L3_INT.items():
-            ret = self._extract_keys(val, block)
+        for key, res in _MATCHER_L3_INT.match(block):
+            ret = res.group(1).split(',')[0].strip()
             if ret != "":
-                self.__logger.debug(f'Key: {key:15s} Val: {ret} ')
-                #self.__logger.debug(f'Key: {key:15s} Val: {ret} dict: {self.__dict__[key]}')
-                if self.__dict__[key] == "":
-                    self.__dict__[key] = ret
-                else:
-                    self.__dict__[key] += f', {ret}'
+                val = getattr(self, key)
+                if val != "":
+                    ret = f'{val}, {ret}'
+                if key in _INTERN_L3_INT:
+                    ret = sys.intern(ret)
+                setattr(self, key, ret)
+                if key in ('ipv4', 'ipv4_sec'):
+                    self.calc_prefixes()
 
 
 class L2Interface():
-    """[Class L3Interface]
+    """[Class L2Interface]
+
+    Argument dbg is kept for compatibility, records don't have own logger
 
     Returns:
         [type] -- [description]
     """
 
+    __slots__ = ('name', 'desc', 'mode', 'status', 'access_vlan', 'trunk_allowed', 'channel_group', 'channel_mode', 'span_tree', 'speed',
+                 'trunk_allowed_bits')
+
     def __init__(self, dbg=logging.INFO):
-        self.__logger = AkarLogging(dbg, "L2Interface").get_color_logger()
         self.name = None
         self.desc = None
         self.mode = None
@@ -153,6 +344,7 @@ class L2Interface():
         self.channel_mode = None
         self.span_tree = None
         self.speed = None
+        self.trunk_allowed_bits = VLAN_ALL
 
     @property
     def dict(self):
@@ -174,30 +366,50 @@ class L2Interface():
     def json(self):
         return json.dumps(self.dict)
 
-    @staticmethod
-    def _extract_keys(pattern, string):
-        res = re.search(r'{}\s?(.*)'.format(pattern), string, re.DOTALL)
-        if res:
-            return res.group(1).strip()
-        return None
+    @property
+    def name_short(self):
+        """
+        Short name of interface (Gi1/0/1), the same as local_port_short of cdp entries
+        """
+        return cdp.shorten_interface(self.name) if self.name else self.name
 
     def get_all_properties(self, block):
-        for key, val in _KEYS_L2_INT.items():
-            ret = self._extract_keys(val, block)
-            if ret is not None:
-                self.__logger.debug(f'Key: {key:15s} Val: {ret}')
-                self.__dict__[key] = ret
+        for key, res in _MATCHER_L2_INT.match(block):
+            ret = res.group(1).strip()
+            if key in _INTERN_L2_INT:
+                ret = sys.intern(ret)
+            setattr(self, key, ret)
+            if key == 'trunk_allowed':
+                self.trunk_allowed_bits = trunk_allowed_bits(self.trunk_allowed_bits, ret)
+
+    @property
+    def is_trunk(self):
+        return self.mode == 'trunk'
+
+    @property
+    def vlan_bits(self):
+        """
+        Bitset of VLANs carried by interface: allowed VLANs of trunk or access VLAN
+        """
+        if self.is_trunk:
+            return self.trunk_allowed_bits
+        if self.access_vlan is not None and self.access_vlan.isdigit():
+            return 1 << int(self.access_vlan)
+        return 0
 
 
 class Vlan():
     """[Class Vlan]
 
+    Argument dbg is kept for compatibility, records don't have own logger
+
     Returns:
         [type] -- [description]
     """
 
+    __slots__ = ('vlan', 'name')
+
     def __init__(self, dbg=logging.INFO):
-        self.__logger = AkarLogging(dbg, "L2Interface").get_color_logger()
         self.vlan = None
         self.name = None
 
@@ -216,99 +428,103 @@ class Vlan():
     def json(self):
         return json.dumps(self.dict)
 
-    @staticmethod
-    def _extract_keys(pattern, string):
-        res = re.search(r'{}\s?(.*)'.format(pattern), string, re.DOTALL)
-        # print(f'string: {string}')
-        if res:
-            return res.group(1).strip()
-            # .split(',')[0].strip()
-        return None
-
     def get_all_properties(self, block):
-        for key, val in _KEYS_VLAN.items():
-            ret = self._extract_keys(val, block)
-            if ret is not None:
-                if key == 'vlan':
-                    ret = int(ret)
-                self.__dict__[key] = ret
-                self.__logger.debug(f'Key: {key:15s} Val: {ret}')
+        for key, res in _MATCHER_VLAN.match(block):
+            ret = res.group(1).strip()
+            if key == 'vlan':
+                ret = int(ret)
+            setattr(self, key, ret)
 
 
 class CiscoDevice():
     """[Class CiscoDevice]
 
+    VLANs are kept as bitset vlan_bits (bit N is VLAN N) and names vlan_names, vlan_entries are built from them
+    With streaming=True file is read line by line and only hostname, interface and vlan blocks are built,
+    memory is used for the largest block instead of the whole configuration
+
     Returns:
         [type] -- [description]
     """
 
-    def __init__(self, file_input, hostname=None, flag_l3_int=False, flag_vlans=False, flag_l2_int=False, dbg=logging.WARNING):
-        self.__logger = AkarLogging(dbg, "CiscoDevice").get_color_logger()
+    def __init__(self, file_input, hostname=None, flag_l3_int=False, flag_vlans=False, flag_l2_int=False, dbg=logging.WARNING, streaming=False):
+        self.__logger = get_color_logger("CiscoDevice", dbg)
         self.__dbg = dbg
         self.hostname = hostname
         self.l3_int_entries = []
-        self.vlan_entries = []
+        self.vlan_bits = 0
+        self.vlan_names = dict()
         self.l2_int_entries = []
         self.file_input = file_input
-        if flag_l3_int:
-            self._get_all_l3_int_entries()
-        if flag_vlans:
-            self._get_all_vlans_entries()
-        if flag_l2_int:
-            self._get_all_l2_int_entries()
-
-    def _get_all_l3_int_entries(self):
-        self.__logger.info("Get Info L3 interfaces")
-        parse = CiscoConfParse(self.file_input)
-        self.hostname = parse.re_match_iter_typed(r'^hostname\s+(\S+)', default='None')
+        self.config_hash = None
+        self.flag_l3_int = flag_l3_int
+        self.flag_vlans = flag_vlans
+        self.flag_l2_int = flag_l2_int
+        self.streaming = streaming
+        if flag_l3_int or flag_vlans or flag_l2_int:
+            self._parse_config()
+
+    def _parse_config(self):
+        self.__logger.info("Parse configuration")
+        if self.streaming:
+            blocks = iter_blocks(self.file_input, keep=_STREAM_BLOCKS)
+        else:
+            blocks = ConfigTree(self.file_input).roots
+        hostname = None
+        for obj in blocks:
+            if hostname is None and obj.text.startswith('hostname'):
+                res = _RE_HOSTNAME.search(obj.text)
+                if res:
+                    hostname = res.group(1)
+            elif obj.text.startswith('interface'):
+                if obj.re_search_children(_RE_L3_INT_CHILD):
+                    if self.flag_l3_int:
+                        self._get_l3_int_entry(obj)
+                elif self.flag_l2_int and not obj.re_search_children(_RE_L2_INT_CHILD):
+                    self._get_l2_int_entry(obj)
+            elif self.flag_vlans and _RE_VLAN.search(obj.text):
+                self._get_vlan_entries(obj)
+        self.hostname = hostname if hostname is not None else 'None'
         self.__logger.info(f"Hostname: {self.hostname}")
-        for obj in parse.find_objects_w_child(r'^interface', r'^\s*ip address'):
-            cisco = L3Interface(self.__dbg)
-            cisco.get_all_properties(obj.text)
-            for obj_child in obj.children:
-                cisco.get_all_properties(obj_child.text)
-            self.l3_int_entries.append(cisco)
-            self.__logger.debug(f"L3 int: {cisco.name} IPv4: {cisco.dict['ipv4']}")
 
-    def _get_all_l2_int_entries(self):
-        self.__logger.info("Get Info L2 interfaces")
-        parse = CiscoConfParse(self.file_input)
-        self.hostname = parse.re_match_iter_typed(r'^hostname\s+(\S+)', default='None')
-        self.__logger.info(f"Hostname: {self.hostname}")
-        for obj in parse.find_objects_wo_child(r'^interface', r'^\s*(no)?\s*ip address'):
-            cisco = L2Interface(self.__dbg)
+    def _get_l3_int_entry(self, obj):
+        cisco = L3Interface(self.__dbg)
+        cisco.get_all_properties(obj.text)
+        for obj_child in obj.children:
+            cisco.get_all_properties(obj_child.text)
+        self.l3_int_entries.append(cisco)
+        self.__logger.debug(f"L3 int: {cisco.name} IPv4: {cisco.ipv4}")
+
+    def _get_l2_int_entry(self, obj):
+        cisco = L2Interface(self.__dbg)
+        cisco.get_all_properties(obj.text)
+        for obj_child in obj.children:
+            cisco.get_all_properties(obj_child.text)
+        self.l2_int_entries.append(cisco)
+        self.__logger.debug(f"L2 int: {cisco.name}")
+
+    def _get_vlan_entries(self, obj):
+        if re.search(r'[,-]', obj.text):
+            self.vlan_bits |= vlan_list_to_bits(obj.text.split()[1])
+        else:
+            cisco = Vlan(self.__dbg)
             cisco.get_all_properties(obj.text)
             for obj_child in obj.children:
                 cisco.get_all_properties(obj_child.text)
-            self.l2_int_entries.append(cisco)
-            self.__logger.debug(f"L2 int: {cisco.name}")
+            self.vlan_bits |= 1 << cisco.vlan
+            if cisco.name is not None:
+                self.vlan_names[cisco.vlan] = cisco.name
+            self.__logger.debug(f"Vlan: {cisco.vlan} {cisco.name}")
 
-    def _get_all_vlans_entries(self):
-        self.__logger.info("Get Info Vlans")
-        parse = CiscoConfParse(self.file_input)
-        self.hostname = parse.re_match_iter_typed(r'^hostname\s+(\S+)', default='None')
-        self.__logger.info(f"Hostname: {self.hostname}")
-        for obj in parse.find_objects(r'^vlan\s*\d+'):
-            if re.search(r'[,-]', obj.text):
-                lst = obj.text.split()[1]
-                for vl in lst.split(','):
-                    if vl.isdigit():
-                        cisco = Vlan(self.__dbg)
-                        cisco.get_all_properties(f'vlan {vl}')
-                        self.vlan_entries.append(cisco)
-                    else:
-                        (ib, ie) = list(vl.strip().split('-'))
-                        for jj in range(int(ib), int(ie) + 1):
-                            cisco = Vlan()
-                            cisco.get_all_properties(f'vlan {jj}')
-                            self.vlan_entries.append(cisco)
-            else:
-                cisco = Vlan(self.__dbg)
-                cisco.get_all_properties(obj.text)
-                for obj_child in obj.children:
-                    cisco.get_all_properties(obj_child.text)
-                self.vlan_entries.append(cisco)
-                self.__logger.debug(f"L2 int: {cisco.name}")
+    @property
+    def vlan_entries(self):
+        resp = []
+        for vlan in bits_to_vlans(self.vlan_bits):
+            cisco = Vlan(self.__dbg)
+            cisco.vlan = vlan
+            cisco.name = self.vlan_names.get(vlan)
+            resp.append(cisco)
+        return resp
 
     @property
     def l3_int_dict(self):
@@ -317,158 +533,305 @@ class CiscoDevice():
         return resp
 
 
+def _iter_hashed_lines(file_name, hsh):
+    # lines of file, the same bytes are added to hash
+    with open(file_name, 'rb') as input_f:
+        for line in input_f:
+            hsh.update(line)
+            yield line.decode(errors='replace')
+
+
+def parse_config_file(file_cfg, flag_l3_int=True, flag_vlans=False, flag_l2_int=False, dbg=logging.WARNING, streaming=False):
+    """
+    Parses one configuration file (or list of lines), returns tuple (CiscoDevice, None) or (None, error)
+    Runs in worker processes of ListDevices, so failures are returned instead of raised.
+    config_hash of parsed file is hash of the bytes which were parsed
+    """
+    try:
+        if not isinstance(file_cfg, str) or not (flag_l3_int or flag_vlans or flag_l2_int):
+            return CiscoDevice(file_cfg, flag_l3_int=flag_l3_int, flag_vlans=flag_vlans, flag_l2_int=flag_l2_int, dbg=dbg, streaming=streaming), None
+        hsh = hashlib.blake2b(digest_size=20)
+        cisco = CiscoDevice(_iter_hashed_lines(file_cfg, hsh), flag_l3_int=flag_l3_int, flag_vlans=flag_vlans, flag_l2_int=flag_l2_int, dbg=dbg, streaming=streaming)
+        cisco.file_input = file_cfg
+        cisco.config_hash = hsh.hexdigest()
+        return cisco, None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+
+def parse_cdp_text(cdp_file):
+    """
+    Parses output of 'show cdp neighbor detail', hostname is taken from prompt 'hostname#'
+    returns tuple (cdp.Device, None) or (None, error)
+    """
+    try:
+        hostname = None
+        rr = re.match(r'^([^#]*)#.*\s*', cdp_file)
+        if rr:
+            hostname = rr.group(1)
+        return cdp.Device(cdp_file, hostname=hostname), None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+
+def parse_cdp_data(data, label=None):
+    """
+    Parses output of 'show cdp neighbor detail' in bytes (content of file or member of archive),
+    returns tuple (cdp.Device, None) or (None, error)
+    """
+    (dev, error) = parse_cdp_text(data.decode(errors='replace'))
+    if dev is not None:
+        dev.cdp_hash = hashlib.blake2b(data, digest_size=20).hexdigest()
+    return dev, error
+
+
+def parse_cdp_file(file_cdp):
+    """
+    Parses one file with output of 'show cdp neighbor detail', returns tuple (cdp.Device, None) or (None, error)
+    """
+    try:
+        with open(file_cdp, 'rb') as input_f:
+            data = input_f.read()
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+    return parse_cdp_data(data)
+
+
+def _iter_data_lines(data):
+    # lines of content in bytes, decoded one by one
+    for line in io.BytesIO(data):
+        yield line.decode(errors='replace')
+
+
+def parse_config_data(data, label, flag_l3_int=True, flag_vlans=False, flag_l2_int=False, dbg=logging.WARNING, streaming=False):
+    """
+    Parses configuration in bytes (member of archive), returns tuple (CiscoDevice, None) or (None, error)
+    file_input of device is label of member '<archive>::<member>', lines are decoded one by one
+    """
+    try:
+        cisco = CiscoDevice(_iter_data_lines(data), flag_l3_int=flag_l3_int, flag_vlans=flag_vlans, flag_l2_int=flag_l2_int, dbg=dbg, streaming=streaming)
+        cisco.file_input = label
+        cisco.config_hash = hashlib.blake2b(data, digest_size=20).hexdigest()
+        return cisco, None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+
+def _stat(file_name):
+    # stat of file before parsing: file changed while it is parsed is not cached under its new hash
+    try:
+        return os.stat(file_name)
+    except OSError:
+        return None
+
+
+def _call(pool, func, *args):
+    return pool.submit(func, *args) if pool is not None else func(*args)
+
+
+def _iter_jobs(kind, files, func, func_data, members, options, cache, pool):
+    # Yields jobs (file name, label, future or result, stat of file before parsing, result is stored in cache)
+    for file_name in files:
+        if not archives.is_archive(file_name):
+            dev = cache.get(kind, file_name, options) if cache is not None else None
+            if dev is not None:
+                yield file_name, file_name, (dev, None), None, False
+                continue
+            stat = _stat(file_name) if cache is not None else None
+            yield file_name, file_name, _call(pool, func, file_name), stat, stat is not None
+            continue
+        try:
+            for (member, data) in archives.iter_members(file_name, members):
+                label = archives.member_label(file_name, member)
+                if cache is not None:
+                    dev = cache.get(kind, label, options, digest=hashlib.blake2b(data, digest_size=20).hexdigest())
+                    if dev is not None:
+                        yield file_name, label, (dev, None), None, False
+                        continue
+                yield file_name, label, _call(pool, func_data, data, label), None, cache is not None
+        except Exception as e:
+            yield file_name, file_name, (None, f'{type(e).__name__}: {e}'), None, False
+
+
+def iter_parsed(kind, files, func, func_data, members='*', options='', cache=None, pool=None, prefetch=0):
+    """
+    Yields tuples (file name, label, (device, error)) of files in order of files, func parses file by name
+    and func_data parses member of archive (bytes, label). Archives are read here, every member matching members
+    is parsed as separate job and has label '<archive>::<member>', file has label = file name.
+    Results found in cache (parsecache.ParseCache) are not parsed, new results are stored in cache:
+    files by path and stat taken before parsing, members by label and hash of content.
+    With pool (ProcessPoolExecutor) at most prefetch jobs are parsed ahead of yielded result
+    """
+    limit = prefetch if pool is not None else 0
+    pending = collections.deque()
+
+    def result(job):
+        (file_name, label, res, stat, store) = job
+        if isinstance(res, Future):
+            res = res.result()
+        (dev, error) = res
+        if store and error is None:
+            cache.put(kind, label, dev, options, digest=dev.config_hash if kind == 'config' else dev.cdp_hash, stat=stat)
+        return file_name, label, res
+
+    for job in _iter_jobs(kind, files, func, func_data, members, options, cache, pool):
+        pending.append(job)
+        if len(pending) > limit:
+            yield result(pending.popleft())
+    while pending:
+        yield result(pending.popleft())
+
+
 class ListDevices():
-    """[Class CiscoDevice]
+    """[Class ListDevices]
+
+    Parses all configuration and cdp files found by glob.
+    With workers > 1 files are parsed in pool of processes, order of results is the same as order of files.
+    Files which can't be parsed are stored in self.errors as tuple (file, error)
+    With cache (parsecache.ParseCache) only files changed since the previous run are parsed
+    With streaming=True configurations are parsed by CiscoDevice in streaming mode
+    Archives (tar.gz, zip, ...) found by glob are read without extraction, only members matching
+    config_members/cdp_members are parsed, every member is parsed by workers as separate file
+    and is cached by its label '<archive>::<member>' and hash of content
+    With lazy=True nothing is parsed and kept in hostnames/hostnames_cdp: iter_devices/iter_devices_cdp
+    parse files on every call and yield devices one by one, with workers > 1 at most prefetch files
+    (or members) are parsed ahead, so memory doesn't depend on number of files
 
     Returns:
         [type] -- [description]
     """
 
-    def __init__(self, path_to_config, path_to_cdp=None, flag_l3_int=True, flag_vlans=False, flag_l2_int=False, dbg=logging.INFO):
-        self.__logger = AkarLogging(dbg, "ListDevices").get_color_logger()
+    def __init__(self, path_to_config, path_to_cdp=None, flag_l3_int=True, flag_vlans=False, flag_l2_int=False, dbg=logging.INFO, workers=1, cache=None, streaming=False, config_members='*', cdp_members='*',
+                 lazy=False, prefetch=None):
+        self.__logger = get_color_logger("ListDevices", dbg)
         self.__dbg = dbg
         self.hostnames = []
         self.hostnames_cdp = []
+        self.errors = []
+        # errors already in self.errors: lazy passes over the same files report them once
+        self._error_keys = set()
         self.l3_networks_groups = dict()
         self.flag_l3_int = flag_l3_int
         self.flag_l2_int = flag_l2_int
         self.flag_vlans = flag_vlans
+        self.workers = workers
+        self.cache = cache
+        self.streaming = streaming
+        self.lazy = lazy
+        self.prefetch = prefetch if prefetch is not None else 2 * workers
         self.path_to_config = f'{path_to_config}'
         self.path_to_cdp = f'{path_to_cdp}'
         self.files_of_config = list(glob.glob(self.path_to_config))
+        self.files_of_cdp = []
         self.__logger.info(f'Found configuration files: {self.files_of_config}')
         if path_to_cdp is not None:
             self.files_of_cdp = list(glob.glob(self.path_to_cdp))
-            # print(f'CDP Files: {self.files_of_cdp}')
-            for file_cdp in self.files_of_cdp:
-                with open(file_cdp) as input_f:
-                    cdp_file = input_f.read()
-                rr = re.match(r'^([^#]*)#.*\s*', cdp_file)
-                if rr:
-                    hostname = rr.group(1)
-                dev = cdp.Device(cdp_file, hostname=hostname)
-                self.hostnames_cdp.append(dev)
-                # print(f'hostname cdp: {dev.hostname}')
-        for file_cfg in self.files_of_config:
-            cisco = CiscoDevice(file_cfg, flag_l3_int=self.flag_l3_int, flag_vlans=self.flag_vlans, flag_l2_int=self.flag_l2_int, dbg=self.__dbg)
-            # print(f'Hostname: {cisco.hostname:15s} File: {file_cfg} ')
-            self.hostnames.append(cisco)
+        parse_cfg = functools.partial(parse_config_file, flag_l3_int=self.flag_l3_int, flag_vlans=self.flag_vlans, flag_l2_int=self.flag_l2_int, dbg=self.__dbg, streaming=self.streaming)
+        parse_cfg_data = functools.partial(parse_config_data, flag_l3_int=self.flag_l3_int, flag_vlans=self.flag_vlans, flag_l2_int=self.flag_l2_int, dbg=self.__dbg, streaming=self.streaming)
+        options_cfg = f'l3_int={self.flag_l3_int};vlans={self.flag_vlans};l2_int={self.flag_l2_int}'
+        # kind: (files, function for file, function for member of archive, pattern of members, options of cache)
+        self._parsers = {
+            'config': (self.files_of_config, parse_cfg, parse_cfg_data, config_members, options_cfg),
+            'cdp': (self.files_of_cdp, parse_cdp_file, parse_cdp_data, cdp_members, ''),
+        }
+        if self.lazy:
+            return
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            self.hostnames_cdp = list(self._collect(self._iter_parsed('cdp', pool)))
+            self.hostnames = list(self._collect(self._iter_parsed('config', pool)))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if self.cache is not None:
+            self.__logger.info(f'Parse cache: {self.cache.stats}')
+
+    def iter_devices(self):
+        """
+        Yields CiscoDevice of configuration files one by one in order of files
+        """
+        if not self.lazy:
+            yield from self.hostnames
+            return
+        yield from self._iter_files('config')
+
+    def iter_devices_cdp(self):
+        """
+        Yields cdp.Device of cdp files one by one in order of files
+        """
+        if not self.lazy:
+            yield from self.hostnames_cdp
+            return
+        yield from self._iter_files('cdp')
+
+    def _iter_parsed(self, kind, pool):
+        (files, func, func_data, members, options) = self._parsers[kind]
+        return iter_parsed(kind, files, func, func_data, members=members, options=options, cache=self.cache, pool=pool, prefetch=self.prefetch)
+
+    def _iter_files(self, kind):
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            yield from self._collect(self._iter_parsed(kind, pool))
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    def _collect(self, results):
+        for _file_name, label, (dev, error) in results:
+            if error is not None:
+                self.__logger.error(f'File: {label} Error: {error}')
+                if (label, error) not in self._error_keys:
+                    self._error_keys.add((label, error))
+                    self.errors.append((label, error))
+            else:
+                yield dev
+
+    def cdp_changes(self, tracker, full=False):
+        """
+        Returns cdpchanges.CdpChanges of cdp devices against previous state of tracker (cdpchanges.CdpTracker)
+        """
+        return tracker.update(self.iter_devices_cdp(), full=full)
+
+    def topology(self):
+        """
+        Returns topology.Topology of all cdp devices
+        """
+        return topology.Topology(self.iter_devices_cdp())
+
+    def export(self, reports=tuple(csvexport.REPORTS), out_dir="output", threads=1):
+        """
+        Writes reports (names of csvexport.REPORTS) walking devices only once,
+        with threads > 1 files of devices are written by pool of threads.
+        With lazy=True files are parsed by every call, so all reports should be written by one call
+        """
+        self.__logger.info(f"Create csv reports: {', '.join(reports)}")
+        groups = csvexport.export_reports(self.iter_devices(), self.iter_devices_cdp(), reports, out_dir=out_dir, threads=threads)
+        if groups is not None:
+            self.l3_networks_groups = groups
 
     def create_csv_vlans(self, out_dir="output"):
-        self.__logger.info(f"Create csv with VLANs ")
-        self._check_exit_dir(out_dir)
-        for cisco in self.hostnames:
-            if cisco.vlan_entries:
-                with open(f'{out_dir}/{cisco.hostname.lower()}_vlans.csv', 'w') as fs:
-                    fs.write(f'Vlan;Name\n')
-                    for ent in cisco.vlan_entries:
-                        fs.write('{vlan};{name}\n'.format_map(ent.dict))
+        self.export(['vlans'], out_dir)
 
     def create_csv_vlans_all(self, out_dir="output"):
-        self.__logger.info(f"Create for all hosts csv file with VLANs ")
-        self._check_exit_dir(out_dir)
-        with open(f'{out_dir}/all_vlans.csv', 'w') as fs:
-            fs.write(f'Vlan;Name;Hosname\n')
-            for cisco in self.hostnames:
-                # print(f'{cisco.hostname}')
-                if cisco.vlan_entries:
-                    for ent in cisco.vlan_entries:
-                        fs.write('{vlan};{name}'.format_map(ent.dict) + f';{cisco.hostname}\n')
+        self.export(['vlans_all'], out_dir)
 
     def create_csv_l3_int(self, out_dir="output"):
-        self.__logger.info(f"Create csv with L3 intefaces ")
-        self._check_exit_dir(out_dir)
-        for cisco in self.hostnames:
-            self.__logger.info(f"Create for host: {cisco.hostname} csv file: {cisco.hostname.lower()}_l3_int.csv ")
-            self.__logger.info(f'Host: {cisco.hostname} Total L3 interfaces: {len(cisco.l3_int_entries)}')
-            if cisco.l3_int_entries:
-                with open(f'{out_dir}/{cisco.hostname.lower()}_l3_int.csv', 'w') as fs:
-                    fs.write(f'NameInt;Desc;Vrf;SubInt;IPv4;IPv4Sec;Status;HSRP_Num;HSRP_IP;HSRP_Pri;IP_Helper\n')
-                    for ent in cisco.l3_int_entries:
-                        # print(f'All: {ent.dict}\n')
-                        if ent.ipv4 != "":
-                            fs.write('{name};{desc};{vrf};{subint};{ipv4};{ipv4_sec};{status};{hsrp_num};{hsrp_ip};{hsrp_pri};{ip_helper}\n'.format_map(ent.dict))
+        self.export(['l3_int'], out_dir)
 
     def create_csv_l3_int_all(self, out_dir="output"):
-        self._check_exit_dir(out_dir)
-        self.__logger.info(f"Create for all hosts csv file with L3 intefaces ")
-        with open(f'{out_dir}/all_l3_int.csv', 'w') as fs:
-            fs.write(f'Hostname;NameInt;Desc;Vrf;SubInt;IPv4;IPv4Sec;IPV_Net;Status;AccessList;HSRP_Num;HSRP_IP;HSRP_Pri;IP_Helper\n')
-            for cisco in self.hostnames:
-                # print(f'{cisco.hostname}')
-                fs.write(f'=====;;;;;;;;;;;;;\n')
-                if cisco.l3_int_entries:
-                    for ent in cisco.l3_int_entries:
-                        if ent.ipv4 != "":
-                            fs.write(f'{cisco.hostname};' + '{name};{desc};{vrf};{subint};{ipv4};{ipv4_sec};{ipv4_net};{status};{access_list};{hsrp_num};{hsrp_ip};{hsrp_pri};{ip_helper}\n'.format_map(ent.dict))
+        self.export(['l3_int_all'], out_dir)
 
     def create_csv_l3_int_network(self, out_dir="output"):
-        self._check_exit_dir(out_dir)
-        # l3_network_groups = dict()
-        for cisco in self.hostnames:
-            # print(f'{cisco.hostname}')
-            if cisco.l3_int_entries:
-                for ent in cisco.l3_int_entries:
-                    # print(f'{ent.dict["ipv4_net"]}')
-                    desc_int = dict()
-                    desc_int['name'] = f'{cisco.hostname}'
-                    desc_int['ip'] = ent.dict['ipv4']
-                    desc_int['int'] = ent.dict['name']
-                    desc_int['desc'] = ent.dict['desc']
-                    if f'{ent.dict["ipv4_net"]}' not in self.l3_networks_groups:
-                        self.l3_networks_groups[f'{ent.dict["ipv4_net"]}'] = list()
-                    self.l3_networks_groups[f'{ent.dict["ipv4_net"]}'].append(desc_int)
-        with open(f'{out_dir}/all_net_l3_int.csv', 'w') as fs:
-            fs.write(f'Networks;Hostname;Interface;IP_Address;Desc\n')
-            for net in sorted(self.l3_networks_groups):
-                # print(f'{net}')
-                fs.write(f'{net}\n')
-                for net_int in self.l3_networks_groups[net]:
-                    fs.write(';{name};{int};{ip};{desc}\n'.format_map(net_int))
+        self.export(['l3_int_network'], out_dir)
 
     def create_csv_l2_int(self, out_dir="output"):
-        self.__logger.info("Create csv file for L2 interfaces")
-        self._check_exit_dir(out_dir)
-        for cisco in self.hostnames:
-            self.__logger.info(f'Host: {cisco.hostname} Total L2 interfaces: {len(cisco.l2_int_entries)}')
-            if cisco.l2_int_entries:
-                with open(f'{out_dir}/{cisco.hostname.lower()}_l2_int.csv', 'w') as fs:
-                    fs.write(f'NameInt;Desc;status;mode;access_vlan;trunk_allowed;channel_group;channel_mode;span_tree;speed\n')
-                    for ent in cisco.l2_int_entries:
-                        # print(f"VLAN: {ent.name} = {ent.ipv4}")
-                        fs.write('{name};{desc};{status};{mode};{access_vlan};{trunk_allowed};{channel_group};{channel_mode};{span_tree};{speed}\n'.format_map(ent.dict))
+        self.export(['l2_int'], out_dir)
 
     def create_csv_l2_int_all(self, out_dir="output"):
-        self._check_exit_dir(out_dir)
-        with open(f'{out_dir}/all_l2_int.csv', 'w') as fs:
-            fs.write(f'HostName;NameInt;Desc;status;mode;access_vlan;trunk_allowed;channel_group;channel_mode;span_tree;speed\n')
-            for cisco in self.hostnames:
-                # print(f'{cisco.hostname}')
-                if cisco.l2_int_entries:
-                    for ent in cisco.l2_int_entries:
-                        fs.write(f'{cisco.hostname.upper()};' + '{name};{desc};{status};{mode};{access_vlan};{trunk_allowed};{channel_group};{channel_mode};{span_tree};{speed}\n'.format_map(ent.dict))
+        self.export(['l2_int_all'], out_dir)
 
     def create_csv_cdp(self, out_dir="output"):
-        self._check_exit_dir(out_dir)
-        for cisco in self.hostnames_cdp:
-            # print(f'{cisco.hostname}')
-            if cisco.dict:
-                with open(f'{out_dir}/{cisco.hostname}_cdp.csv', 'w') as fs:
-                    fs.write(f'LocalName;LocalPort;RemoteName;RemotePort;RemotePlatform;RemoteIP\n')
-                    for ent in cisco.dict:
-                        # print(f"VLAN: {ent.name} = {ent.ipv4}")
-                        fs.write(f'{cisco.hostname};' + '{local_port};{device_id};{remote_port};{platform};{ip_address}\n'.format_map(ent))
+        self.export(['cdp'], out_dir)
 
     def create_csv_cdp_all(self, out_dir="output"):
-        self._check_exit_dir(out_dir)
-        with open(f'{out_dir}/all_cdp.csv', 'w') as fs:
-            fs.write(f'LocalName;LocalPort;RemoteName;RemotePort;RemotePlatform;RemoteIP\n')
-            for cisco in self.hostnames_cdp:
-                # print(f'{cisco.hostname}')
-                if cisco.dict:
-                    for ent in cisco.dict:
-                        fs.write(f'{cisco.hostname};' + '{local_port};{device_id};{remote_port};{platform};{ip_address}\n'.format_map(ent))
-
-    def _check_exit_dir(self, path_dir):
-        if not os.path.exists(f'{path_dir}'):
-            os.makedirs(f'{path_dir}')
+        self.export(['cdp_all'], out_dir)
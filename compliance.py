@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Compliance of cisco configurations with golden config rules
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Golden config compliance: rules are compiled once to a RuleSet, every configuration is read
+in one pass over its top level blocks (cfgtree.iter_blocks) and every block is checked only by rules
+which literal first word is the first word of the block. Configurations are checked in parallel,
+result is matrix device x rule (NumPy int8: PASS, FAIL, NA).
+
+Rules (dictionaries, e.g. from yaml file):
+    {'name': 'ntp', 'require': '^ntp server '}                 - top level line must exist
+    {'name': 'no_http', 'forbid': '^ip http server'}           - top level line must not exist
+    {'name': 'snmp_location', 'match': '^snmp-server location (.+)', 'expect': 'DC-.*'}
+                                                               - line must exist, captures are kept as details,
+                                                                 with expect every first capture must match it
+    {'name': 'bpduguard', 'parent': '^interface ', 'role': '^switchport mode access',
+     'require_child': '^spanning-tree bpduguard enable'}       - every block matching parent with child matching role
+                                                                 must have child (forbid_child - must not have),
+                                                                 children are matched without indentation
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import functools
+import glob
+import logging
+import re
+import numpy as np
+import yaml
+from concurrent.futures import ProcessPoolExecutor
+import akarlibs.csvexport as csvexport
+from .akarlogging import get_color_logger
+from .cfgtree import iter_blocks
+
+PASS = 1
+FAIL = 0
+NA = -1
+STATUS_NAMES = {PASS: 'PASS', FAIL: 'FAIL', NA: 'NA'}
+
+_RE_HOSTNAME = re.compile(r'^hostname\s+(\S+)')
+
+# First word of pattern which has to be the whole first word of line: '^ip http' -> 'ip'
+_RE_FIRST_WORD = re.compile(r'^\^([A-Za-z][\w-]*)(?: (?![*?{])|\\s(?![*?{])|\$)')
+_RULE_KINDS = ('require', 'forbid', 'match', 'parent')
+
+
+def _top_level_alternation(pattern):
+    """
+    Returns True if pattern has '|' outside of groups and character classes
+    """
+    depth = 0
+    in_class = False
+    pos = 0
+    while pos < len(pattern):
+        char = pattern[pos]
+        if char == '\\':
+            pos += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+            # ']' right after '[' or '[^' is literal
+            if pattern[pos + 1:pos + 2] == '^':
+                pos += 1
+            if pattern[pos + 1:pos + 2] == ']':
+                pos += 1
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            return True
+        pos += 1
+    return False
+
+
+def first_word(pattern):
+    """
+    Returns literal first word of line required by pattern or None.
+    Pattern with top level alternation ('^ntp |^sntp ') can match other first words and has no first word
+    """
+    if _top_level_alternation(pattern):
+        return None
+    res = _RE_FIRST_WORD.match(pattern)
+    if res:
+        return res.group(1)
+    return None
+
+
+class Rule():
+    """[Class Rule]
+
+    One compiled rule, kind is 'require', 'forbid', 'match' or 'parent'
+    """
+
+    __slots__ = ('name', 'kind', 'regex', 'role', 'child', 'child_required', 'expect', 'word')
+
+    def __init__(self, rule):
+        self.name = rule['name']
+        kinds = [kind for kind in _RULE_KINDS if kind in rule]
+        if len(kinds) != 1:
+            raise ValueError(f'Rule {self.name}: exactly one of {_RULE_KINDS} is required')
+        self.kind = kinds[0]
+        self.regex = re.compile(rule[self.kind])
+        self.word = first_word(rule[self.kind])
+        self.role = None
+        self.child = None
+        self.child_required = True
+        self.expect = None
+        if self.kind == 'parent':
+            if ('require_child' in rule) == ('forbid_child' in rule):
+                raise ValueError(f'Rule {self.name}: one of require_child, forbid_child is required')
+            self.child_required = 'require_child' in rule
+            self.child = re.compile(rule['require_child'] if self.child_required else rule['forbid_child'])
+            if rule.get('role') is not None:
+                self.role = re.compile(rule['role'])
+        elif self.kind == 'match' and rule.get('expect') is not None:
+            self.expect = re.compile(rule['expect'])
+
+    def __repr__(self):
+        return f'<Rule {self.name} {self.kind} {self.regex.pattern!r}>'
+
+    def check_block(self, block, details):
+        """
+        Checks top level block, adds found lines (or failed blocks for 'parent') to details
+        """
+        if self.kind == 'parent':
+            if not self.regex.search(block.text):
+                return
+            children = [child.text.strip() for child in block.children]
+            if self.role is not None and not any(self.role.search(text) for text in children):
+                return
+            details.setdefault('applied', 0)
+            details['applied'] += 1
+            if any(self.child.search(text) for text in children) != self.child_required:
+                details.setdefault('failed', []).append(block.text)
+            return
+        res = self.regex.search(block.text)
+        if res:
+            if self.kind == 'match':
+                details.setdefault('captures', []).append(res.groups())
+            else:
+                details.setdefault('lines', []).append(block.text)
+
+    def status(self, details):
+        if self.kind == 'require':
+            return PASS if details.get('lines') else FAIL
+        if self.kind == 'forbid':
+            return FAIL if details.get('lines') else PASS
+        if self.kind == 'match':
+            captures = details.get('captures')
+            if not captures:
+                return FAIL
+            if self.expect is not None and not all(groups and groups[0] is not None and self.expect.fullmatch(groups[0]) for groups in captures):
+                return FAIL
+            return PASS
+        if not details.get('applied'):
+            return NA
+        return FAIL if details.get('failed') else PASS
+
+
+class RuleSet():
+    """[Class RuleSet]
+
+    Rules compiled once, indexed by literal first word of their top level pattern
+    """
+
+    def __init__(self, rules):
+        self.rules = [rule if isinstance(rule, Rule) else Rule(rule) for rule in rules]
+        names = [rule.name for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError('Names of rules must be unique')
+        self.names = names
+        # first word of line: list of (index, rule)
+        self._by_word = dict()
+        self._generic = []
+        for num, rule in enumerate(self.rules):
+            if rule.word is None:
+                self._generic.append((num, rule))
+            else:
+                self._by_word.setdefault(rule.word, []).append((num, rule))
+
+    @classmethod
+    def from_yaml(cls, file_rules):
+        with open(file_rules) as input_f:
+            return cls(yaml.safe_load(input_f))
+
+    def __len__(self):
+        return len(self.rules)
+
+    def check(self, config_input):
+        """
+        Checks configuration (file or list of lines), returns tuple (hostname, list of statuses, list of details)
+        """
+        details = [dict() for _rule in self.rules]
+        hostname = 'None'
+        for block in iter_blocks(config_input):
+            words = block.text.split(None, 1)
+            if not words:
+                continue
+            if words[0] == 'hostname':
+                res = _RE_HOSTNAME.search(block.text)
+                if res:
+                    hostname = res.group(1)
+            for num, rule in self._by_word.get(words[0], ()):
+                rule.check_block(block, details[num])
+            for num, rule in self._generic:
+                rule.check_block(block, details[num])
+        return hostname, [rule.status(rule_details) for rule, rule_details in zip(self.rules, details)], details
+
+
+def check_config(config_input, ruleset):
+    """
+    Checks one configuration, returns tuple ((hostname, statuses, details), None) or (None, error)
+    """
+    try:
+        return ruleset.check(config_input), None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+
+class ComplianceMatrix():
+    """[Class ComplianceMatrix]
+
+    status[i, j] - status (PASS, FAIL, NA) of rule rule_names[j] on device hostnames[i]
+    details[i][j] - lines found by rule, failed blocks or captures
+    """
+
+    def __init__(self, hostnames, rule_names, status, details, files=None):
+        self.hostnames = hostnames
+        self.rule_names = rule_names
+        self.status = status
+        self.details = details
+        self.files = files if files is not None else []
+
+    def _rule_index(self, rule_name):
+        return self.rule_names.index(rule_name)
+
+    def failed(self, rule_name):
+        """
+        Returns list of hostnames failed rule
+        """
+        return [self.hostnames[num] for num in np.flatnonzero(self.status[:, self._rule_index(rule_name)] == FAIL)]
+
+    def failures(self):
+        """
+        Returns dictionary {hostname: list of failed rules} of devices with failures
+        """
+        fails = self.status == FAIL
+        return {self.hostnames[num]: [self.rule_names[rule] for rule in np.flatnonzero(fails[num])] for num in np.flatnonzero(fails.any(axis=1))}
+
+    def rule_summary(self):
+        """
+        Returns dictionary {rule: {'PASS': count, 'FAIL': count, 'NA': count}}
+        """
+        return {
+            name: {STATUS_NAMES[status]: int((self.status[:, num] == status).sum()) for status in (PASS, FAIL, NA)}
+            for num, name in enumerate(self.rule_names)
+        }
+
+    def scores(self):
+        """
+        Returns dictionary {hostname: part of applied rules passed}
+        """
+        applied = (self.status != NA).sum(axis=1)
+        passed = (self.status == PASS).sum(axis=1)
+        return {hostname: float(passed[num] / applied[num]) if applied[num] else 1.0 for num, hostname in enumerate(self.hostnames)}
+
+    def to_csv(self, path):
+        rows = ([hostname] + [STATUS_NAMES[status] for status in self.status[num]] for num, hostname in enumerate(self.hostnames))
+        csvexport.write_csv(path, ['Hostname'] + self.rule_names, rows)
+
+
+class ComplianceEngine():
+    """[Class ComplianceEngine]
+
+    Checks configurations against rules, configurations are checked by pool of processes if workers > 1.
+    Configurations which can't be read are stored in self.errors as tuple (file, error)
+    """
+
+    def __init__(self, rules, workers=1, dbg=logging.INFO):
+        self.__logger = get_color_logger("ComplianceEngine", dbg)
+        self.ruleset = rules if isinstance(rules, RuleSet) else RuleSet(rules)
+        self.workers = workers
+        self.errors = []
+
+    def check_files(self, files):
+        """
+        Checks files (glob pattern or list of files or lists of lines), returns ComplianceMatrix
+        """
+        if isinstance(files, str):
+            files = sorted(glob.glob(files))
+        files = list(files)
+        func = functools.partial(check_config, ruleset=self.ruleset)
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(func, files, chunksize=max(1, len(files) // (self.workers * 4))))
+        else:
+            results = [func(file_input) for file_input in files]
+        hostnames = []
+        status = []
+        details = []
+        checked = []
+        self.errors = []
+        for file_input, (res, error) in zip(files, results):
+            if error is not None:
+                self.__logger.error(f'File: {file_input} Error: {error}')
+                self.errors.append((file_input, error))
+                continue
+            hostnames.append(res[0])
+            status.append(res[1])
+            details.append(res[2])
+            checked.append(file_input)
+        matrix = np.array(status, dtype=np.int8).reshape(len(status), len(self.ruleset))
+        self.__logger.info(f'Checked devices: {len(hostnames)} rules: {len(self.ruleset)} failed: {int((matrix == FAIL).sum())}')
+        return ComplianceMatrix(hostnames, list(self.ruleset.names), matrix, details, checked)
+
+    def check_devices(self, devices):
+        """
+        Checks configurations of devices (ciscocfg.CiscoDevice or ListDevices.hostnames),
+        members of archives ('<archive>::<member>') are read from archive
+        """
+        return self.check_files([cisco.file_input for cisco in devices])
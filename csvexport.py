@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Export of reports of ciscocfg.ListDevices to csv files
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Export of csv reports for devices parsed by ciscocfg.
+Devices are walked once for all requested reports, rows are written by csv module
+with large buffers, files of devices can be written by pool of threads.
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+BUFFER_SIZE = 1 << 20
+
+_L3_INT_FIELDS = ('name', 'desc', 'vrf', 'subint', 'ipv4', 'ipv4_sec', 'status', 'hsrp_num', 'hsrp_ip', 'hsrp_pri', 'ip_helper')
+_L3_INT_ALL_FIELDS = ('name', 'desc', 'vrf', 'subint', 'ipv4', 'ipv4_sec', 'ipv4_net', 'status', 'access_list', 'hsrp_num', 'hsrp_ip', 'hsrp_pri', 'ip_helper')
+_L2_INT_FIELDS = ('name', 'desc', 'status', 'mode', 'access_vlan', 'trunk_allowed', 'channel_group', 'channel_mode', 'span_tree', 'speed')
+_CDP_FIELDS = ('local_port', 'device_id', 'remote_port', 'platform', 'ip_address')
+_CDP_HEADER = ('LocalName', 'LocalPort', 'RemoteName', 'RemotePort', 'RemotePlatform', 'RemoteIP')
+
+
+def _values(ent_dict, fields):
+    # None is written as 'None' like in reports made by format_map
+    return ['None' if ent_dict[key] is None else ent_dict[key] for key in fields]
+
+
+def _rows_vlans(cisco):
+    return [(ent.vlan, ent.dict['name']) for ent in cisco.vlan_entries]
+
+
+def _rows_vlans_all(cisco):
+    return [(ent.vlan, ent.dict['name'], cisco.hostname) for ent in cisco.vlan_entries]
+
+
+def _rows_l3_int(cisco):
+    return [_values(ent.dict, _L3_INT_FIELDS) for ent in cisco.l3_int_entries if ent.ipv4 != ""]
+
+
+def _rows_l3_int_all(cisco):
+    rows = [['====='] + [''] * 13]
+    rows.extend([cisco.hostname] + _values(ent.dict, _L3_INT_ALL_FIELDS) for ent in cisco.l3_int_entries if ent.ipv4 != "")
+    return rows
+
+
+def _rows_l2_int(cisco):
+    return [_values(ent.dict, _L2_INT_FIELDS) for ent in cisco.l2_int_entries]
+
+
+def _rows_l2_int_all(cisco):
+    return [[cisco.hostname.upper()] + _values(ent.dict, _L2_INT_FIELDS) for ent in cisco.l2_int_entries]
+
+
+def _rows_cdp(cisco):
+    return [[cisco.hostname] + _values(ent, _CDP_FIELDS) for ent in cisco.dict]
+
+
+# name: (source of devices, file name, header, rows of one device)
+# file name with {hostname} is written for every device which has rows
+REPORTS = {
+    'vlans': ('config', '{hostname_lower}_vlans.csv', ('Vlan', 'Name'), _rows_vlans),
+    'vlans_all': ('config', 'all_vlans.csv', ('Vlan', 'Name', 'Hosname'), _rows_vlans_all),
+    'l3_int': ('config', '{hostname_lower}_l3_int.csv', ('NameInt', 'Desc', 'Vrf', 'SubInt', 'IPv4', 'IPv4Sec', 'Status', 'HSRP_Num', 'HSRP_IP', 'HSRP_Pri', 'IP_Helper'), _rows_l3_int),
+    'l3_int_all': ('config', 'all_l3_int.csv', ('Hostname', 'NameInt', 'Desc', 'Vrf', 'SubInt', 'IPv4', 'IPv4Sec', 'IPV_Net', 'Status', 'AccessList', 'HSRP_Num', 'HSRP_IP', 'HSRP_Pri', 'IP_Helper'), _rows_l3_int_all),
+    'l3_int_network': ('config', 'all_net_l3_int.csv', ('Networks', 'Hostname', 'Interface', 'IP_Address', 'Desc'), None),
+    'l2_int': ('config', '{hostname_lower}_l2_int.csv', ('NameInt', 'Desc', 'status', 'mode', 'access_vlan', 'trunk_allowed', 'channel_group', 'channel_mode', 'span_tree', 'speed'), _rows_l2_int),
+    'l2_int_all': ('config', 'all_l2_int.csv', ('HostName', 'NameInt', 'Desc', 'status', 'mode', 'access_vlan', 'trunk_allowed', 'channel_group', 'channel_mode', 'span_tree', 'speed'), _rows_l2_int_all),
+    'cdp': ('cdp', '{hostname}_cdp.csv', _CDP_HEADER, _rows_cdp),
+    'cdp_all': ('cdp', 'all_cdp.csv', _CDP_HEADER, _rows_cdp),
+}
+
+
+def open_csv(path):
+    output_f = open(path, 'w', newline='', buffering=BUFFER_SIZE)
+    return output_f, csv.writer(output_f, delimiter=';', lineterminator='\n')
+
+
+def write_csv(path, header, rows):
+    output_f, writer = open_csv(path)
+    with output_f:
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def device_file_name(report, hostname):
+    return REPORTS[report][1].format(hostname=hostname, hostname_lower=str(hostname).lower())
+
+
+def is_device_report(report):
+    return '{' in REPORTS[report][1]
+
+
+def add_network_rows(groups, cisco):
+    """
+    Adds L3 interfaces of device to groups {network: list of interfaces}
+    """
+    for ent in cisco.l3_int_entries:
+        ent_dict = ent.dict
+        desc_int = {
+            'name': f'{cisco.hostname}',
+            'ip': ent_dict['ipv4'],
+            'int': ent_dict['name'],
+            'desc': ent_dict['desc'],
+        }
+        groups.setdefault(ent_dict['ipv4_net'], list()).append(desc_int)
+
+
+def write_network_report(path, groups):
+    output_f, writer = open_csv(path)
+    with output_f:
+        writer.writerow(REPORTS['l3_int_network'][2])
+        for net in sorted(groups):
+            # csv.writer writes "" for one empty field, network of interfaces without address is empty line
+            writer.writerow((net,) if net != '' else ())
+            writer.writerows(('', net_int['name'], net_int['int'], net_int['ip'], net_int['desc']) for net_int in groups[net])
+
+
+def export_reports(devices, devices_cdp, reports, out_dir='output', threads=1):
+    """
+    Writes reports (names of REPORTS) for devices (CiscoDevice) and devices_cdp (cdp.Device) to out_dir.
+    Every list of devices is walked once, devices can be any iterable.
+    Returns groups of networks {network: list of interfaces} if 'l3_int_network' is requested
+    """
+    if not os.path.exists(f'{out_dir}'):
+        os.makedirs(f'{out_dir}')
+    for report in reports:
+        if report not in REPORTS:
+            raise ValueError(f'Unknown report: {report}')
+    groups = dict() if 'l3_int_network' in reports else None
+    pool = ThreadPoolExecutor(max_workers=threads) if threads > 1 else None
+    futures = []
+    files_all = dict()
+    try:
+        for report in reports:
+            if REPORTS[report][3] is not None and not is_device_report(report):
+                files_all[report] = open_csv(f'{out_dir}/{REPORTS[report][1]}')
+                files_all[report][1].writerow(REPORTS[report][2])
+        for (source, devs) in (('config', devices), ('cdp', devices_cdp)):
+            source_reports = [report for report in reports if REPORTS[report][0] == source and REPORTS[report][3] is not None]
+            if not source_reports and not (source == 'config' and groups is not None):
+                continue
+            for cisco in devs:
+                for report in source_reports:
+                    rows = REPORTS[report][3](cisco)
+                    if report in files_all:
+                        files_all[report][1].writerows(rows)
+                    elif rows:
+                        args = (f'{out_dir}/{device_file_name(report, cisco.hostname)}', REPORTS[report][2], rows)
+                        if pool is not None:
+                            futures.append(pool.submit(write_csv, *args))
+                        else:
+                            write_csv(*args)
+                if source == 'config' and groups is not None:
+                    add_network_rows(groups, cisco)
+    finally:
+        for (output_f, _writer) in files_all.values():
+            output_f.close()
+        if pool is not None:
+            pool.shutdown()
+    for future in futures:
+        future.result()
+    if groups is not None:
+        write_network_report(f'{out_dir}/{REPORTS["l3_int_network"][1]}', groups)
+    return groups
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Prefix trie of L3 interfaces of all devices
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Patricia trie of IPv4 prefixes and index of addresses of L3 interfaces
+(primary, secondary and HSRP) of all devices parsed by ciscocfg.
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import re
+from .ciscocfg import ipv4_to_int, int_to_ipv4, prefix_to_netmask
+
+_RE_IPV4 = re.compile(r'^\d+\.\d+\.\d+\.\d+$')
+
+
+class _Node():
+    __slots__ = ('prefix', 'prefixlen', 'children', 'values')
+
+    def __init__(self, prefix, prefixlen):
+        self.prefix = prefix
+        self.prefixlen = prefixlen
+        self.children = [None, None]
+        self.values = None
+
+
+def _bit(addr, pos):
+    return (addr >> (31 - pos)) & 1
+
+
+def _common_len(addr1, addr2, limit):
+    diff = addr1 ^ addr2
+    if diff == 0:
+        return limit
+    return min(32 - diff.bit_length(), limit)
+
+
+class PrefixTrie():
+    """[Class PrefixTrie]
+
+    Path compressed binary (Patricia) trie of IPv4 prefixes, every prefix has list of values
+    """
+
+    def __init__(self):
+        self._root = _Node(0, 0)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, addr, prefixlen, value):
+        """
+        Adds value to prefix addr/prefixlen, host bits of addr are ignored
+        """
+        prefix = addr & prefix_to_netmask(prefixlen)
+        node = self._root
+        while True:
+            if node.prefixlen == prefixlen and node.prefix == prefix:
+                break
+            bit = _bit(prefix, node.prefixlen)
+            child = node.children[bit]
+            if child is None:
+                node.children[bit] = node = _Node(prefix, prefixlen)
+                break
+            common = _common_len(child.prefix, prefix, min(child.prefixlen, prefixlen))
+            if common == child.prefixlen:
+                node = child
+                continue
+            if common == prefixlen:
+                new = leaf = _Node(prefix, prefixlen)
+            else:
+                new = _Node(prefix & prefix_to_netmask(common), common)
+                leaf = _Node(prefix, prefixlen)
+                new.children[_bit(prefix, common)] = leaf
+            new.children[_bit(child.prefix, common)] = child
+            node.children[bit] = new
+            node = leaf
+            break
+        if node.values is None:
+            node.values = []
+            self._count += 1
+        node.values.append(value)
+
+    def longest_match(self, addr):
+        """
+        Returns tuple (prefix, prefixlen, values) of the longest prefix containing addr or None
+        """
+        best = None
+        node = self._root
+        while node is not None:
+            if (addr & prefix_to_netmask(node.prefixlen)) != node.prefix:
+                break
+            if node.values:
+                best = node
+            if node.prefixlen == 32:
+                break
+            node = node.children[_bit(addr, node.prefixlen)]
+        if best is None:
+            return None
+        return (best.prefix, best.prefixlen, best.values)
+
+    def items(self):
+        """
+        Yields tuples (prefix, prefixlen, values) in order of addresses
+        """
+        for node, _parents in self._walk():
+            yield (node.prefix, node.prefixlen, node.values)
+
+    def overlaps(self):
+        """
+        Yields tuples (outer, inner) of prefixes (prefix, prefixlen) where inner is part of outer
+        """
+        for node, parents in self._walk():
+            for parent in parents:
+                yield ((parent.prefix, parent.prefixlen), (node.prefix, node.prefixlen))
+
+    def _walk(self):
+        stack = [(self._root, ())]
+        while stack:
+            (node, parents) = stack.pop()
+            if node.values:
+                yield node, parents
+                parents = parents + (node,)
+            for child in reversed(node.children):
+                if child is not None:
+                    stack.append((child, parents))
+
+
+class AddressEntry():
+    """[Class AddressEntry]
+
+    Address of L3 interface, kind is 'primary', 'secondary' or 'hsrp'
+    """
+
+    __slots__ = ('hostname', 'interface', 'vrf', 'kind', 'addr', 'prefixlen')
+
+    def __init__(self, hostname, interface, vrf, kind, addr, prefixlen):
+        self.hostname = hostname
+        self.interface = interface
+        self.vrf = vrf
+        self.kind = kind
+        self.addr = addr
+        self.prefixlen = prefixlen
+
+    def __repr__(self):
+        return f'AddressEntry: {self.hostname} {self.interface} {self.ip}'
+
+    @property
+    def ip(self):
+        return f'{int_to_ipv4(self.addr)}/{self.prefixlen}'
+
+    @property
+    def dict(self):
+        resp = {
+            'hostname': self.hostname,
+            'interface': self.interface,
+            'vrf': self.vrf,
+            'kind': self.kind,
+            'ip': self.ip,
+        }
+        return resp
+
+
+class L3Index():
+    """[Class L3Index]
+
+    Index of addresses of L3 interfaces of devices (ciscocfg.CiscoDevice parsed with flag_l3_int).
+    Every VRF has own PrefixTrie, global table is VRF ''.
+    Addresses are given as strings '10.1.1.1'.
+    """
+
+    def __init__(self, devices=()):
+        self.tries = dict()
+        self.hosts = dict()
+        for cisco in devices:
+            self.add_device(cisco)
+
+    def add_device(self, cisco):
+        for ent in cisco.l3_int_entries:
+            if ent.ipv4_addr is None:
+                ent.calc_prefixes()
+            vrf = ent.vrf
+            if ent.ipv4_addr is not None:
+                self._add(AddressEntry(cisco.hostname, ent.name, vrf, 'primary', ent.ipv4_addr, ent.ipv4_prefixlen))
+            for (addr, prefixlen) in ent.ipv4_sec_addrs:
+                self._add(AddressEntry(cisco.hostname, ent.name, vrf, 'secondary', addr, prefixlen))
+            for hsrp_ip in ent.hsrp_ip.split(','):
+                tokens = hsrp_ip.split()
+                if tokens and _RE_IPV4.match(tokens[0]):
+                    prefixlen = ent.ipv4_prefixlen if ent.ipv4_prefixlen is not None else 32
+                    self._add(AddressEntry(cisco.hostname, ent.name, vrf, 'hsrp', ipv4_to_int(tokens[0]), prefixlen))
+
+    def _add(self, entry):
+        self.tries.setdefault(entry.vrf, PrefixTrie()).add(entry.addr, entry.prefixlen, entry)
+        self.hosts.setdefault((entry.vrf, entry.addr), []).append(entry)
+
+    def _vrfs(self, vrf):
+        if vrf is None:
+            return list(self.tries)
+        return [vrf]
+
+    def longest_match(self, ip, vrf=''):
+        """
+        Returns tuple (network, entries) of the most specific network containing ip or None
+        """
+        trie = self.tries.get(vrf)
+        if trie is None:
+            return None
+        res = trie.longest_match(ipv4_to_int(ip))
+        if res is None:
+            return None
+        (prefix, prefixlen, entries) = res
+        return (f'{int_to_ipv4(prefix)}/{prefixlen}', entries)
+
+    def owner(self, ip, vrf=None):
+        """
+        Returns entries of interfaces with address ip, in all VRFs if vrf is None
+        """
+        addr = ipv4_to_int(ip)
+        resp = []
+        for vrf_name in self._vrfs(vrf):
+            resp.extend(self.hosts.get((vrf_name, addr), []))
+        return resp
+
+    def duplicate_ips(self, include_hsrp=False):
+        """
+        Returns dictionary {(vrf, ip): entries} of addresses configured on more than one interface.
+        HSRP addresses are shared by routers of group and are skipped by default
+        """
+        resp = dict()
+        for (vrf, addr), entries in self.hosts.items():
+            if not include_hsrp:
+                entries = [ent for ent in entries if ent.kind != 'hsrp']
+            if len(entries) > 1:
+                resp[(vrf, int_to_ipv4(addr))] = entries
+        return resp
+
+    def overlapping_subnets(self):
+        """
+        Returns list of tuples (vrf, outer network, inner network) of different networks which overlap
+        """
+        resp = []
+        for vrf, trie in self.tries.items():
+            for (outer, inner) in trie.overlaps():
+                resp.append((vrf, f'{int_to_ipv4(outer[0])}/{outer[1]}', f'{int_to_ipv4(inner[0])}/{inner[1]}'))
+        return resp
+
+    def networks(self, vrf=''):
+        """
+        Yields tuples (network, entries) in order of addresses
+        """
+        trie = self.tries.get(vrf)
+        if trie is not None:
+            for (prefix, prefixlen, entries) in trie.items():
+                yield (f'{int_to_ipv4(prefix)}/{prefixlen}', entries)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# On-disk cache of parsed configuration and cdp files
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+On-disk cache of parsed files (CiscoDevice, cdp.Device).
+Entry is keyed by path, options and CACHE_VERSION and verified by size, mtime and hash of content,
+so file is parsed again only when its content or format of parsed records was changed.
+Member of archive is keyed by its label '<archive>::<member>' and verified only by hash of its content.
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import glob
+import hashlib
+import logging
+import os
+import pickle
+import akarlibs.archives as archives
+from .akarlogging import get_color_logger
+
+# Increased when parsed records (slots of CiscoDevice, L3Interface, ...) are changed, old entries are not used
+CACHE_VERSION = 2
+
+
+def file_digest(path):
+    """
+    Returns hash of content of file
+    """
+    hsh = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as input_f:
+        for chunk in iter(lambda: input_f.read(1 << 20), b''):
+            hsh.update(chunk)
+    return hsh.hexdigest()
+
+
+class ParseCache():
+    """[Class ParseCache]
+
+    Cache of parsed results in directory cache_dir, one pickle file for each entry.
+    With verify=True hash of content is checked even if size and mtime of file are the same.
+    """
+
+    def __init__(self, cache_dir='.akarlibs_cache', verify=True, dbg=logging.WARNING):
+        self.__logger = get_color_logger("ParseCache", dbg)
+        self.cache_dir = cache_dir
+        self.verify = verify
+        self.hits = 0
+        self.misses = 0
+        if not os.path.exists(f'{self.cache_dir}'):
+            os.makedirs(f'{self.cache_dir}')
+
+    @property
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(glob.glob(f'{self.cache_dir}/*.pickle')),
+        }
+
+    @staticmethod
+    def _hash_str(string):
+        return hashlib.sha1(string.encode()).hexdigest()
+
+    def _entry_path(self, kind, path, options):
+        return f'{self.cache_dir}/{self._hash_str(os.path.abspath(path))}-{self._hash_str(f"{CACHE_VERSION}|{kind}|{options}")[:12]}.pickle'
+
+    def get(self, kind, path, options='', digest=None):
+        """
+        Returns cached result for file or None if file was changed or not in cache.
+        Entry which can't be loaded (broken file, records of other version of code) is a miss.
+        For member of archive (path is label '<archive>::<member>') digest is hash of its content
+        """
+        entry_path = self._entry_path(kind, path, options)
+        member = archives.split_label(path) is not None
+        try:
+            stat = os.stat(path) if not member else None
+            with open(entry_path, 'rb') as input_f:
+                entry = pickle.load(input_f)
+            same_stat = not member and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns
+        except Exception as e:
+            if not isinstance(e, FileNotFoundError):
+                self.__logger.info(f'Entry of file: {path} is not loaded: {type(e).__name__}: {e}')
+            self.misses += 1
+            return None
+        if member:
+            if digest is None or digest != entry['digest']:
+                self.__logger.info(f'Member: {path} was changed')
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry['result']
+        if not same_stat or self.verify:
+            digest = file_digest(path)
+            if digest != entry['digest']:
+                self.__logger.info(f'File: {path} was changed')
+                self.misses += 1
+                return None
+            if not same_stat:
+                self._write(entry_path, dict(entry, size=stat.st_size, mtime=stat.st_mtime_ns))
+        self.hits += 1
+        return entry['result']
+
+    def put(self, kind, path, result, options='', digest=None, stat=None):
+        """
+        Stores result of file. digest is hash of the bytes which were parsed and stat is os.stat of file
+        taken before parsing: file changed while it was parsed is not cached under its new hash.
+        Without digest file is hashed again. Member of archive has no stat, its digest is required
+        """
+        if stat is None and archives.split_label(path) is None:
+            stat = os.stat(path)
+        entry = {
+            'path': path,
+            'size': stat.st_size if stat is not None else None,
+            'mtime': stat.st_mtime_ns if stat is not None else None,
+            'digest': digest if digest is not None else file_digest(path),
+            'result': result,
+        }
+        self._write(self._entry_path(kind, path, options), entry)
+
+    @staticmethod
+    def _write(entry_path, entry):
+        tmp_path = f'{entry_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as output_f:
+            pickle.dump(entry, output_f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+
+    def invalidate(self, path=None):
+        """
+        Removes entries of file path from cache, all entries if path is None
+        """
+        if path is None:
+            pattern = f'{self.cache_dir}/*.pickle'
+        else:
+            pattern = f'{self.cache_dir}/{self._hash_str(os.path.abspath(path))}-*.pickle'
+        for entry_path in glob.glob(pattern):
+            os.remove(entry_path)
+        self.__logger.info(f'Cache invalidated: {pattern}')
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Clustering of similar cisco configurations (MinHash/LSH)
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Near-duplicate configurations: lines of configuration are normalized (addresses, descriptions
+and hostname are replaced) and used as shingles together with their parent line,
+every configuration gets MinHash signature, signatures are indexed by LSH (bands of signature).
+Clusters and nearest neighbours are found from buckets of LSH, without comparison of all pairs.
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import functools
+import glob
+import hashlib
+import logging
+import re
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .akarlogging import get_color_logger
+from .cfgtree import iter_blocks
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_RE_IPV4 = re.compile(r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b')
+# Values of lines starting with these words are replaced by placeholder
+_PLACEHOLDERS = {'hostname': 'hostname <hostname>', 'description': 'description <desc>'}
+
+
+def normalize_line(line):
+    """
+    Returns line without indentation and repeated spaces, with addresses, hostname and descriptions replaced by placeholders
+    """
+    words = line.split()
+    if not words:
+        return ''
+    if words[0] in _PLACEHOLDERS:
+        return _PLACEHOLDERS[words[0]]
+    line = ' '.join(words)
+    if '.' in line:
+        line = _RE_IPV4.sub('<ip>', line)
+    return line
+
+
+def config_shingles(config_input):
+    """
+    Returns set of shingles of configuration (file or list of lines): top level lines
+    and lines of children prefixed by their parent line
+    """
+    shingles = set()
+    for block in iter_blocks(config_input):
+        parent = normalize_line(block.text)
+        shingles.add(parent)
+        stack = [(parent, child) for child in block.children]
+        while stack:
+            (path, obj) = stack.pop()
+            text = f'{path} / {normalize_line(obj.text)}'
+            shingles.add(text)
+            stack.extend((text, child) for child in obj.children)
+    return shingles
+
+
+def hash_shingles(shingles):
+    """
+    Returns 32 bit hashes of shingles as numpy array
+    """
+    return np.fromiter((int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=4).digest(), 'little') for shingle in shingles),
+                       dtype=np.uint64, count=len(shingles))
+
+
+def optimal_bands(threshold, num_perm):
+    """
+    Returns (bands, rows) with bands * rows <= num_perm which threshold (1/bands)^(1/rows) is the closest to threshold
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class MinHasher():
+    """[Class MinHasher]
+
+    num_perm hash functions (a * x + b) mod p, signature is minimum of every function over shingles.
+    Shingles are hashed by chunks of chunk_size, memory is num_perm * chunk_size values for any size of configuration
+    """
+
+    chunk_size = 2048
+
+    def __init__(self, num_perm=128, seed=1):
+        self.num_perm = num_perm
+        gen = np.random.RandomState(seed)
+        self._a = gen.randint(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self._b = gen.randint(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles):
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        hashes = hash_shingles(shingles)
+        resp = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(hashes), self.chunk_size):
+            values = self._a[:, None] * hashes[None, start:start + self.chunk_size]
+            values += self._b[:, None]
+            values %= np.uint64(_MERSENNE_PRIME)
+            values &= np.uint64(_MAX_HASH)
+            np.minimum(resp, values.min(axis=1), out=resp)
+        return resp.astype(np.uint32)
+
+
+def config_signature(config_input, hasher):
+    """
+    Returns tuple (signature, None) or (None, error) of configuration
+    """
+    try:
+        return hasher.signature(config_shingles(config_input)), None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+
+class ConfigLSH():
+    """[Class ConfigLSH]
+
+    LSH index of MinHash signatures of configurations.
+    Configurations with estimated Jaccard similarity >= threshold share bucket in some band with high probability.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=128, seed=1, workers=1, dbg=logging.INFO):
+        self.__logger = get_color_logger("ConfigLSH", dbg)
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        self.workers = workers
+        self.keys = []
+        self.signatures = []
+        self.errors = []
+        self._index = dict()
+        # band: {bytes of band of signature: list of indexes of keys}
+        self._buckets = [dict() for _band in range(self.bands)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _band_keys(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add(self, key, signature):
+        if key in self._index:
+            raise ValueError(f'Key already exists: {key}')
+        num = len(self.keys)
+        self._index[key] = num
+        self.keys.append(key)
+        self.signatures.append(signature)
+        for band, band_key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(band_key, []).append(num)
+
+    def add_files(self, files, keys=None):
+        """
+        Adds configurations (glob pattern or list of files), key is name of file by default.
+        Signatures are calculated by pool of processes if workers > 1, configurations with existing key are stored in self.errors
+        """
+        if isinstance(files, str):
+            files = sorted(glob.glob(files))
+        files = list(files)
+        keys = files if keys is None else list(keys)
+        func = functools.partial(config_signature, hasher=self.hasher)
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(func, files, chunksize=max(1, len(files) // (self.workers * 4))))
+        else:
+            results = [func(file_input) for file_input in files]
+        for key, (signature, error) in zip(keys, results):
+            if error is None and key in self._index:
+                error = f'Key already exists: {key}'
+            if error is not None:
+                self.__logger.error(f'Configuration: {key} Error: {error}')
+                self.errors.append((key, error))
+            else:
+                self.add(key, signature)
+        self.__logger.info(f'Indexed configurations: {len(self.keys)} bands: {self.bands} rows: {self.rows}')
+
+    def add_devices(self, devices):
+        """
+        Adds configurations of devices (ciscocfg.CiscoDevice), key is file_input: hostname can be
+        the same in many files or missing ('None'). Members of archives ('<archive>::<member>') are read from archive
+        """
+        self.add_files([cisco.file_input for cisco in devices])
+
+    def similarity(self, key1, key2):
+        """
+        Returns estimated Jaccard similarity of shingles of two configurations
+        """
+        return float(np.mean(self.signatures[self._index[key1]] == self.signatures[self._index[key2]]))
+
+    def candidates(self, key):
+        num = self._index[key]
+        resp = set()
+        for band, band_key in enumerate(self._band_keys(self.signatures[num])):
+            resp.update(self._buckets[band][band_key])
+        resp.discard(num)
+        return resp
+
+    def neighbours(self, key, count=5):
+        """
+        Returns list of (key, similarity) of the most similar configurations with similarity >= threshold
+        """
+        signature = self.signatures[self._index[key]]
+        resp = []
+        for num in self.candidates(key):
+            sim = float(np.mean(self.signatures[num] == signature))
+            if sim >= self.threshold:
+                resp.append((self.keys[num], sim))
+        resp.sort(key=lambda item: (-item[1], f'{item[0]}'))
+        return resp[:count]
+
+    def clusters(self, min_size=2):
+        """
+        Returns list of clusters (lists of keys), the biggest first.
+        Members of every bucket are compared only with the first member of bucket
+        """
+        parent = list(range(len(self.keys)))
+
+        def find(num):
+            while parent[num] != num:
+                parent[num] = parent[parent[num]]
+                num = parent[num]
+            return num
+
+        for buckets in self._buckets:
+            for members in buckets.values():
+                first = members[0]
+                for num in members[1:]:
+                    if find(num) != find(first) and np.mean(self.signatures[num] == self.signatures[first]) >= self.threshold:
+                        parent[find(num)] = find(first)
+        groups = dict()
+        for num in range(len(self.keys)):
+            groups.setdefault(find(num), []).append(self.keys[num])
+        return sorted((members for members in groups.values() if len(members) >= min_size), key=lambda members: (-len(members), f'{members[0]}'))
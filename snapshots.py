@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Historical store of data parsed from configurations
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+SQLite store of snapshots of ciscocfg.CiscoDevice results (L3 interfaces, L2 interfaces, VLANs).
+Every row has run of its appearance (valid_from) and of its removal (valid_to),
+a run updates only devices which hash of configuration was changed.
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import hashlib
+import logging
+import sqlite3
+from datetime import datetime
+from .akarlogging import get_color_logger
+from .ciscocfg import ipv4_to_int, int_to_ipv4
+from .parsecache import file_digest
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    ts TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS devices (
+    hostname TEXT PRIMARY KEY,
+    file TEXT,
+    config_hash TEXT,
+    first_run INTEGER,
+    changed_run INTEGER,
+    seen_run INTEGER
+);
+CREATE TABLE IF NOT EXISTS l3_int (
+    hostname TEXT NOT NULL,
+    interface TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    vrf TEXT,
+    ipv4_addr INTEGER,
+    ipv4_prefixlen INTEGER,
+    desc TEXT,
+    status TEXT,
+    valid_from INTEGER NOT NULL,
+    valid_to INTEGER
+);
+CREATE TABLE IF NOT EXISTS l2_int (
+    hostname TEXT NOT NULL,
+    interface TEXT NOT NULL,
+    mode TEXT,
+    access_vlan TEXT,
+    trunk_allowed TEXT,
+    desc TEXT,
+    status TEXT,
+    valid_from INTEGER NOT NULL,
+    valid_to INTEGER
+);
+CREATE TABLE IF NOT EXISTS vlans (
+    hostname TEXT NOT NULL,
+    vlan INTEGER NOT NULL,
+    name TEXT,
+    valid_from INTEGER NOT NULL,
+    valid_to INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_ts ON runs (ts);
+CREATE INDEX IF NOT EXISTS l3_int_host ON l3_int (hostname, interface);
+CREATE INDEX IF NOT EXISTS l3_int_ip ON l3_int (ipv4_addr);
+CREATE INDEX IF NOT EXISTS l3_int_from ON l3_int (valid_from);
+CREATE INDEX IF NOT EXISTS l2_int_host ON l2_int (hostname, interface);
+CREATE INDEX IF NOT EXISTS l2_int_from ON l2_int (valid_from);
+CREATE INDEX IF NOT EXISTS vlans_host ON vlans (hostname, vlan);
+CREATE INDEX IF NOT EXISTS vlans_vlan ON vlans (vlan);
+'''
+
+# table: columns of values of row, without hostname and valid_from/valid_to
+_COLUMNS = {
+    'l3_int': ('interface', 'kind', 'vrf', 'ipv4_addr', 'ipv4_prefixlen', 'desc', 'status'),
+    'l2_int': ('interface', 'mode', 'access_vlan', 'trunk_allowed', 'desc', 'status'),
+    'vlans': ('vlan', 'name'),
+}
+
+
+def config_hash(cisco):
+    """
+    Returns hash of configuration of CiscoDevice (file or list of lines)
+    """
+    if cisco.config_hash is not None:
+        return cisco.config_hash
+    if isinstance(cisco.file_input, str):
+        return file_digest(cisco.file_input)
+    hsh = hashlib.blake2b(digest_size=20)
+    for line in cisco.file_input:
+        hsh.update(line.encode(errors='replace'))
+    return hsh.hexdigest()
+
+
+def device_rows(cisco):
+    """
+    Returns dictionary {table: set of rows} of CiscoDevice
+    """
+    rows = {table: set() for table in _COLUMNS}
+    for ent in cisco.l3_int_entries:
+        if ent.ipv4_addr is not None:
+            rows['l3_int'].add((ent.name, 'primary', ent.vrf, ent.ipv4_addr, ent.ipv4_prefixlen, ent.desc, ent.status))
+        for (addr, prefixlen) in ent.ipv4_sec_addrs:
+            rows['l3_int'].add((ent.name, 'secondary', ent.vrf, addr, prefixlen, ent.desc, ent.status))
+    for ent in cisco.l2_int_entries:
+        rows['l2_int'].add((ent.name, ent.mode, ent.access_vlan, ent.trunk_allowed, ent.desc, ent.status))
+    for ent in cisco.vlan_entries:
+        rows['vlans'].add((ent.vlan, ent.name))
+    return rows
+
+
+class SnapshotStore():
+    """[Class SnapshotStore]
+
+    Snapshots of parsed devices in SQLite database db_path
+    """
+
+    def __init__(self, db_path='snapshots.db', dbg=logging.WARNING):
+        self.__logger = get_color_logger("SnapshotStore", dbg)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def add_run(self, devices, ts=None, full=False):
+        """
+        Stores run of parsed devices (CiscoDevice), ts is time of run (ISO string), now by default.
+        Only devices with changed hash of configuration are updated.
+        Devices missing in run keep their rows open unless full=True: then devices is the whole estate
+        and all rows of missing devices are closed in this run.
+        Rows are kept by hostname: device with hostname already seen in this run (the same hostname
+        in other file or no hostname in many files) is not stored and is reported in duplicates.
+        Returns dictionary with id of run, lists of changed, unchanged and removed hostnames
+        and list of (hostname, file) of duplicates
+        """
+        if ts is None:
+            ts = datetime.now().isoformat(timespec='seconds')
+        resp = {'run': None, 'changed': [], 'unchanged': [], 'removed': [], 'duplicates': []}
+        # hostname: file of device stored in this run
+        seen = dict()
+        with self.conn:
+            run = self.conn.execute('INSERT INTO runs (ts) VALUES (?)', (ts,)).lastrowid
+            resp['run'] = run
+            for cisco in devices:
+                if cisco.hostname in seen:
+                    self.__logger.error(f'Hostname: {cisco.hostname} File: {cisco.file_input} is skipped, the same hostname in file: {seen[cisco.hostname]}')
+                    resp['duplicates'].append((cisco.hostname, f'{cisco.file_input}'))
+                    continue
+                seen[cisco.hostname] = f'{cisco.file_input}'
+                digest = config_hash(cisco)
+                row = self.conn.execute('SELECT config_hash FROM devices WHERE hostname = ?', (cisco.hostname,)).fetchone()
+                if row is not None and row[0] == digest:
+                    self.conn.execute('UPDATE devices SET seen_run = ? WHERE hostname = ?', (run, cisco.hostname))
+                    resp['unchanged'].append(cisco.hostname)
+                    continue
+                if row is None:
+                    self.conn.execute('INSERT INTO devices (hostname, file, config_hash, first_run, changed_run, seen_run) VALUES (?, ?, ?, ?, ?, ?)',
+                                      (cisco.hostname, f'{cisco.file_input}', digest, run, run, run))
+                else:
+                    self.conn.execute('UPDATE devices SET file = ?, config_hash = ?, changed_run = ?, seen_run = ? WHERE hostname = ?',
+                                      (f'{cisco.file_input}', digest, run, run, cisco.hostname))
+                self._update_rows(cisco.hostname, device_rows(cisco), run)
+                resp['changed'].append(cisco.hostname)
+            if full:
+                query = 'SELECT hostname FROM devices WHERE seen_run < ? AND config_hash IS NOT NULL ORDER BY hostname'
+                for (hostname,) in self.conn.execute(query, (run,)).fetchall():
+                    self._update_rows(hostname, {table: set() for table in _COLUMNS}, run)
+                    # device appearing again with the same configuration gets its rows back
+                    self.conn.execute('UPDATE devices SET config_hash = NULL WHERE hostname = ?', (hostname,))
+                    resp['removed'].append(hostname)
+        self.__logger.info(f"Run: {run} changed: {len(resp['changed'])} unchanged: {len(resp['unchanged'])} removed: {len(resp['removed'])} "
+                           f"duplicates: {len(resp['duplicates'])}")
+        return resp
+
+    def _update_rows(self, hostname, rows, run):
+        for table, columns in _COLUMNS.items():
+            cols = ', '.join(columns)
+            current = dict()
+            for row in self.conn.execute(f'SELECT rowid, {cols} FROM {table} WHERE hostname = ? AND valid_to IS NULL', (hostname,)):
+                current[tuple(row[1:])] = row[0]
+            removed = [(run, rowid) for (values, rowid) in current.items() if values not in rows[table]]
+            added = [(hostname,) + values + (run,) for values in rows[table] if values not in current]
+            self.conn.executemany(f'UPDATE {table} SET valid_to = ? WHERE rowid = ?', removed)
+            self.conn.executemany(f'INSERT INTO {table} (hostname, {cols}, valid_from) VALUES ({", ".join("?" * (len(columns) + 2))})', added)
+
+    def runs(self):
+        return self.conn.execute('SELECT id, ts FROM runs ORDER BY id').fetchall()
+
+    def ip_history(self, ip):
+        """
+        Returns list of dictionaries: where address ip was configured, from which run till which run
+        """
+        query = '''
+            SELECT l.hostname, l.interface, l.kind, l.vrf, l.ipv4_prefixlen, rf.ts, rt.ts
+            FROM l3_int l JOIN runs rf ON rf.id = l.valid_from LEFT JOIN runs rt ON rt.id = l.valid_to
+            WHERE l.ipv4_addr = ? ORDER BY l.valid_from
+        '''
+        resp = []
+        for (hostname, interface, kind, vrf, prefixlen, since, until) in self.conn.execute(query, (ipv4_to_int(ip),)):
+            resp.append({
+                'hostname': hostname,
+                'interface': interface,
+                'kind': kind,
+                'vrf': vrf,
+                'ip': f'{ip}/{prefixlen}',
+                'since': since,
+                'until': until,
+            })
+        return resp
+
+    def interfaces_added_since(self, ts):
+        """
+        Returns list of (hostname, interface, ts) of interfaces which appeared first in run at ts or later
+        """
+        query = '''
+            SELECT hostname, interface, MIN(rf.ts) AS first_ts FROM (
+                SELECT hostname, interface, valid_from FROM l3_int
+                UNION ALL
+                SELECT hostname, interface, valid_from FROM l2_int
+            ) JOIN runs rf ON rf.id = valid_from
+            GROUP BY hostname, interface HAVING first_ts >= ? ORDER BY first_ts, hostname, interface
+        '''
+        return self.conn.execute(query, (ts,)).fetchall()
+
+    def interfaces_removed_since(self, ts):
+        """
+        Returns list of (hostname, interface, ts) of interfaces which are not in configuration any more
+        and were removed in run at ts or later
+        """
+        query = '''
+            SELECT hostname, interface, MAX(rt.ts) AS last_ts FROM (
+                SELECT hostname, interface, valid_to FROM l3_int
+                UNION ALL
+                SELECT hostname, interface, valid_to FROM l2_int
+            ) LEFT JOIN runs rt ON rt.id = valid_to
+            GROUP BY hostname, interface HAVING COUNT(valid_to) = COUNT(*) AND last_ts >= ? ORDER BY last_ts, hostname, interface
+        '''
+        return self.conn.execute(query, (ts,)).fetchall()
+
+    def vlan_history(self, vlan):
+        """
+        Returns list of (hostname, name, since, until) for VLAN
+        """
+        query = '''
+            SELECT v.hostname, v.name, rf.ts, rt.ts
+            FROM vlans v JOIN runs rf ON rf.id = v.valid_from LEFT JOIN runs rt ON rt.id = v.valid_to
+            WHERE v.vlan = ? ORDER BY v.valid_from, v.hostname
+        '''
+        return self.conn.execute(query, (vlan,)).fetchall()
+
+    def device_ips(self, hostname, ts=None):
+        """
+        Returns list of (interface, ip, kind, vrf) configured on device at time ts (now by default)
+        """
+        if ts is None:
+            rows = self.conn.execute('SELECT interface, ipv4_addr, ipv4_prefixlen, kind, vrf FROM l3_int WHERE hostname = ? AND valid_to IS NULL', (hostname,))
+        else:
+            query = '''
+                SELECT l.interface, l.ipv4_addr, l.ipv4_prefixlen, l.kind, l.vrf
+                FROM l3_int l JOIN runs rf ON rf.id = l.valid_from LEFT JOIN runs rt ON rt.id = l.valid_to
+                WHERE l.hostname = ? AND rf.ts <= ? AND (rt.ts IS NULL OR rt.ts > ?)
+            '''
+            rows = self.conn.execute(query, (hostname, ts, ts))
+        return sorted((interface, f'{int_to_ipv4(addr)}/{prefixlen}', kind, vrf) for (interface, addr, prefixlen, kind, vrf) in rows)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Columnar tables of results of ciscocfg.ListDevices
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Results of ciscocfg.ListDevices as columnar tables (pandas DataFrame, Arrow Table)
+built directly from parsed records, without csv files.
+Tables: l3_int, l2_int, vlans, cdp
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import os
+import pandas as pd
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+TABLES = ('l3_int', 'l2_int', 'vlans', 'cdp')
+
+_L3_INT_FIELDS = ('name', 'desc', 'vrf', 'subint', 'status', 'ipv4', 'ipv4_net', 'ipv4_sec', 'access_list', 'hsrp_num', 'hsrp_ip', 'hsrp_pri', 'ip_helper')
+_L2_INT_FIELDS = ('name', 'desc', 'mode', 'status', 'trunk_allowed', 'channel_group', 'channel_mode', 'span_tree', 'speed')
+_CDP_FIELDS = ('device_id', 'ip_address', 'platform', 'capabilities', 'local_port', 'remote_port')
+# Columns with few different values are stored as pandas categories
+_CATEGORIES = ('hostname', 'vrf', 'status', 'access_list', 'mode', 'speed', 'platform', 'capabilities')
+
+
+def _frame(columns):
+    df = pd.DataFrame(columns)
+    for col in _CATEGORIES:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def l3_int_columns(devices):
+    columns = {key: [] for key in ('hostname',) + _L3_INT_FIELDS + ('ipv4_addr', 'ipv4_prefixlen')}
+    for cisco in devices:
+        for ent in cisco.l3_int_entries:
+            ent_dict = ent.dict
+            columns['hostname'].append(cisco.hostname)
+            for key in _L3_INT_FIELDS:
+                columns[key].append(ent_dict[key])
+            columns['ipv4_addr'].append(ent.ipv4_addr)
+            columns['ipv4_prefixlen'].append(ent.ipv4_prefixlen)
+    return columns
+
+
+def l2_int_columns(devices):
+    columns = {key: [] for key in ('hostname',) + _L2_INT_FIELDS + ('access_vlan', 'is_trunk')}
+    for cisco in devices:
+        for ent in cisco.l2_int_entries:
+            columns['hostname'].append(cisco.hostname)
+            for key in _L2_INT_FIELDS:
+                columns[key].append(getattr(ent, key))
+            columns['access_vlan'].append(int(ent.access_vlan) if ent.access_vlan is not None and ent.access_vlan.isdigit() else None)
+            columns['is_trunk'].append(ent.is_trunk)
+    return columns
+
+
+def vlans_columns(devices):
+    columns = {'hostname': [], 'vlan': [], 'name': []}
+    for cisco in devices:
+        for ent in cisco.vlan_entries:
+            columns['hostname'].append(cisco.hostname)
+            columns['vlan'].append(ent.vlan)
+            columns['name'].append(ent.name)
+    return columns
+
+
+def cdp_columns(devices_cdp):
+    columns = {key: [] for key in ('hostname',) + _CDP_FIELDS}
+    for dev in devices_cdp:
+        for ent in dev.dict:
+            columns['hostname'].append(dev.hostname)
+            for key in _CDP_FIELDS:
+                columns[key].append(ent[key])
+    return columns
+
+
+class ResultTables():
+    """[Class ResultTables]
+
+    Tables of ListDevices (or lists of devices), every table is built once on first access.
+    Devices of ListDevices are taken by iter_devices/iter_devices_cdp, so lazy ListDevices
+    parses files again for every table
+    """
+
+    def __init__(self, list_devices=None, devices=(), devices_cdp=()):
+        self._list_devices = list_devices
+        self._devices = devices
+        self._devices_cdp = devices_cdp
+        self._tables = dict()
+
+    def _iter_devices(self):
+        if self._list_devices is not None:
+            return self._list_devices.iter_devices()
+        return self._devices
+
+    def _iter_devices_cdp(self):
+        if self._list_devices is not None:
+            return self._list_devices.iter_devices_cdp()
+        return self._devices_cdp
+
+    def table(self, name):
+        if name not in self._tables:
+            if name == 'l3_int':
+                columns = l3_int_columns(self._iter_devices())
+                df = _frame(columns)
+                df['ipv4_addr'] = df['ipv4_addr'].astype('UInt32')
+                df['ipv4_prefixlen'] = df['ipv4_prefixlen'].astype('UInt8')
+            elif name == 'l2_int':
+                df = _frame(l2_int_columns(self._iter_devices()))
+                df['access_vlan'] = df['access_vlan'].astype('UInt16')
+            elif name == 'vlans':
+                df = _frame(vlans_columns(self._iter_devices()))
+                df['vlan'] = df['vlan'].astype('uint16')
+            elif name == 'cdp':
+                df = _frame(cdp_columns(self._iter_devices_cdp()))
+            else:
+                raise ValueError(f'Unknown table: {name}')
+            self._tables[name] = df
+        return self._tables[name]
+
+    @property
+    def l3_int(self):
+        return self.table('l3_int')
+
+    @property
+    def l2_int(self):
+        return self.table('l2_int')
+
+    @property
+    def vlans(self):
+        return self.table('vlans')
+
+    @property
+    def cdp(self):
+        return self.table('cdp')
+
+    def filter(self, name, **conditions):
+        """
+        Returns rows of table matching all conditions column=value,
+        value can be list/tuple/set (any of values) or function of column returning bool mask
+        filter('l3_int', vrf='MGMT', status=['', 'shutdown'])
+        """
+        df = self.table(name)
+        mask = pd.Series(True, index=df.index)
+        for col, val in conditions.items():
+            if callable(val):
+                mask &= val(df[col])
+            elif isinstance(val, (list, tuple, set, frozenset)):
+                mask &= df[col].isin(val)
+            else:
+                mask &= df[col] == val
+        return df[mask]
+
+    def group_by(self, name, by, agg=None):
+        """
+        Groups table by columns, returns number of rows of every group or aggregation agg
+        group_by('l2_int', ['hostname', 'mode'])
+        """
+        groups = self.table(name).groupby(by, observed=True, dropna=False)
+        if agg is None:
+            return groups.size().reset_index(name='count')
+        return groups.agg(agg).reset_index()
+
+    def to_arrow(self, name):
+        if pa is None:
+            raise ImportError('pyarrow is required for Arrow tables')
+        return pa.Table.from_pandas(self.table(name), preserve_index=False)
+
+    def to_parquet(self, out_dir="output", tables=TABLES, snapshot=None):
+        """
+        Writes tables to out_dir/<table>.parquet, with snapshot (e.g. date of run)
+        to out_dir/<table>-<snapshot>.parquet with column snapshot for keeping history
+        """
+        if not os.path.exists(f'{out_dir}'):
+            os.makedirs(f'{out_dir}')
+        for name in tables:
+            df = self.table(name)
+            file_name = f'{out_dir}/{name}.parquet'
+            if snapshot is not None:
+                df = df.assign(snapshot=snapshot)
+                file_name = f'{out_dir}/{name}-{snapshot}.parquet'
+            df.to_parquet(file_name, index=False)
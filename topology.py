@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Topology graph of devices built from cdp outputs
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Graph of devices and links built from cdp.Device of all devices (ListDevices.hostnames_cdp).
+The same link is seen from both sides: entries are joined by hash of pair of endpoints (device, port),
+link seen from both sides is bidirectional. Graph is indexed by device (adjacency) and by interface.
+Queries: BFS, shortest path and blast radius (devices cut off from roots by failed devices or interfaces).
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import collections
+import akarlibs.csvexport as csvexport
+
+
+class Link():
+    """[Class Link]
+
+    Link between two endpoints (hostname, port), endpoints are sorted.
+    bidirectional is True if link is seen in cdp of both devices
+    """
+
+    __slots__ = ('ends', 'platforms', 'ip_addresses', 'bidirectional')
+
+    def __init__(self, ends):
+        self.ends = ends
+        # endpoint: platform and address of device of endpoint, as seen by neighbour
+        self.platforms = dict()
+        self.ip_addresses = dict()
+        self.bidirectional = False
+
+    def __repr__(self):
+        return f'Link: {self.ends[0][0]} {self.ends[0][1]} - {self.ends[1][0]} {self.ends[1][1]}'
+
+    @property
+    def hostnames(self):
+        return (self.ends[0][0], self.ends[1][0])
+
+    def other(self, end):
+        """
+        Returns opposite endpoint of link, end is endpoint or hostname
+        """
+        if end == self.ends[0] or end == self.ends[0][0]:
+            return self.ends[1]
+        return self.ends[0]
+
+    @property
+    def dict(self):
+        resp = {
+            'hostname_a': self.ends[0][0],
+            'port_a': self.ends[0][1],
+            'hostname_b': self.ends[1][0],
+            'port_b': self.ends[1][1],
+            'platform_a': self.platforms.get(self.ends[0]),
+            'platform_b': self.platforms.get(self.ends[1]),
+            'ip_address_a': self.ip_addresses.get(self.ends[0]),
+            'ip_address_b': self.ip_addresses.get(self.ends[1]),
+            'bidirectional': self.bidirectional,
+        }
+        return resp
+
+
+class Topology():
+    """[Class Topology]
+
+    Graph of devices built from cdp.Device objects.
+    self.links - {(end_a, end_b): Link}, self.interfaces - {(hostname, port): [links]},
+    self.adjacency - {hostname: {neighbour: [links]}}
+    """
+
+    def __init__(self, devices_cdp=()):
+        self.links = dict()
+        self.interfaces = dict()
+        self.adjacency = dict()
+        # endpoints seen by device itself: (local end, remote end) of every cdp entry
+        self._seen = set()
+        for device in devices_cdp:
+            self.add_device(device)
+
+    def __len__(self):
+        return len(self.adjacency)
+
+    def add_device(self, device):
+        """
+        Adds entries of cdp.Device, device without hostname is skipped
+        """
+        if not device.hostname:
+            return
+        self.adjacency.setdefault(device.hostname, dict())
+        for entry in device.cdp_entries:
+            if not entry.device_id or not entry.local_port or not entry.remote_port:
+                continue
+            self.add_link((device.hostname, entry.local_port), (entry.remove_domain(), entry.remote_port), entry.platform, entry.ip_address)
+
+    def add_link(self, local, remote, platform=None, ip_address=None):
+        """
+        Adds link seen from local endpoint, the same link seen from remote endpoint is joined by key (sorted endpoints)
+        """
+        key = (local, remote) if local <= remote else (remote, local)
+        link = self.links.get(key)
+        if link is None:
+            link = self.links[key] = Link(key)
+            self.interfaces.setdefault(local, []).append(link)
+            self.interfaces.setdefault(remote, []).append(link)
+            self.adjacency.setdefault(local[0], dict()).setdefault(remote[0], []).append(link)
+            self.adjacency.setdefault(remote[0], dict()).setdefault(local[0], []).append(link)
+        elif (remote, local) in self._seen:
+            link.bidirectional = True
+        self._seen.add((local, remote))
+        link.platforms[remote] = platform
+        link.ip_addresses[remote] = ip_address
+        return link
+
+    def neighbours(self, hostname):
+        return sorted(self.adjacency.get(hostname, ()))
+
+    def links_of(self, hostname, port=None):
+        """
+        Returns links of device, or of interface if port is given
+        """
+        if port is not None:
+            return list(self.interfaces.get((hostname, port), ()))
+        return [link for links in self.adjacency.get(hostname, dict()).values() for link in links]
+
+    def unidirectional(self):
+        """
+        Returns links seen only from one side (neighbour without cdp output or mismatch of ports)
+        """
+        return [link for link in self.links.values() if not link.bidirectional]
+
+    def _walk(self, starts, failed_hosts=frozenset(), failed_links=frozenset(), max_depth=None):
+        depth = {host: 0 for host in starts if host in self.adjacency and host not in failed_hosts}
+        parent = dict()
+        queue = collections.deque(depth)
+        while queue:
+            host = queue.popleft()
+            if max_depth is not None and depth[host] >= max_depth:
+                continue
+            for neighbour, links in self.adjacency[host].items():
+                if neighbour in depth or neighbour in failed_hosts:
+                    continue
+                if failed_links and all(id(link) in failed_links for link in links):
+                    continue
+                depth[neighbour] = depth[host] + 1
+                parent[neighbour] = host
+                queue.append(neighbour)
+        return depth, parent
+
+    def bfs(self, start, max_depth=None):
+        """
+        Returns dictionary {hostname: distance in hops} of devices reachable from start, in order of BFS
+        """
+        return self._walk([start], max_depth=max_depth)[0]
+
+    def shortest_path(self, source, target):
+        """
+        Returns list of hostnames of the shortest path (in hops) from source to target or None
+        """
+        (depth, parent) = self._walk([source])
+        if target not in depth:
+            return None
+        path = [target]
+        while path[-1] != source:
+            path.append(parent[path[-1]])
+        return path[::-1]
+
+    def components(self):
+        """
+        Returns list of connected groups of devices (sorted lists of hostnames), the biggest first
+        """
+        resp = []
+        left = set(self.adjacency)
+        while left:
+            group = self._walk([min(left)])[0]
+            left.difference_update(group)
+            resp.append(sorted(group))
+        return sorted(resp, key=lambda group: (-len(group), group[0]))
+
+    def blast_radius(self, failed, roots):
+        """
+        Returns sorted list of devices reachable from roots before and not reachable after failure.
+        failed is list of hostnames and interfaces (hostname, port), failed devices are not in result
+        """
+        failed_hosts = {item for item in failed if isinstance(item, str)}
+        failed_links = {id(link) for item in failed if not isinstance(item, str) for link in self.interfaces.get(tuple(item), ())}
+        before = self._walk(roots)[0]
+        after = self._walk(roots, failed_hosts, failed_links)[0]
+        return sorted(host for host in before if host not in after and host not in failed_hosts)
+
+    def to_csv(self, path):
+        """
+        Writes csv file of links: HostnameA;PortA;HostnameB;PortB;PlatformA;PlatformB;Bidirectional
+        """
+        rows = ((*link.ends[0], *link.ends[1], link.platforms.get(link.ends[0]), link.platforms.get(link.ends[1]), link.bidirectional)
+                for link in sorted(self.links.values(), key=lambda link: link.ends))
+        csvexport.write_csv(path, ('HostnameA', 'PortA', 'HostnameB', 'PortB', 'PlatformA', 'PlatformB', 'Bidirectional'), rows)
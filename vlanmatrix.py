@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Matrix device x VLAN for devices parsed by ciscocfg
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Matrices device x VLAN and trunk x VLAN (NumPy) built from bitsets of ciscocfg.CiscoDevice
+(parsed with flag_vlans and flag_l2_int), queries over VLANs are vectorized.
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import numpy as np
+
+VLAN_BITS = 4096
+
+
+def bits_to_matrix(bitsets):
+    """
+    Returns bool matrix len(bitsets) x 4096 of list of bitsets
+    """
+    if not bitsets:
+        return np.zeros((0, VLAN_BITS), dtype=bool)
+    raw = np.frombuffer(b''.join(bits.to_bytes(VLAN_BITS // 8, 'little') for bits in bitsets), dtype=np.uint8)
+    return np.unpackbits(raw.reshape(len(bitsets), VLAN_BITS // 8), axis=1, bitorder='little').view(bool)
+
+
+class VlanMatrix():
+    """[Class VlanMatrix]
+
+    defined[i, vlan]   - VLAN is defined on device hostnames[i]
+    trunks[j, vlan]    - VLAN is allowed on trunk trunk_names[j] (hostname, interface)
+    carried[i, vlan]   - VLAN is allowed on any trunk or is access VLAN of any port of device hostnames[i]
+    """
+
+    def __init__(self, devices):
+        self.hostnames = []
+        self.trunk_names = []
+        defined = []
+        carried = []
+        trunks = []
+        for cisco in devices:
+            self.hostnames.append(cisco.hostname)
+            defined.append(cisco.vlan_bits)
+            carried_bits = 0
+            for ent in cisco.l2_int_entries:
+                carried_bits |= ent.vlan_bits
+                if ent.is_trunk:
+                    self.trunk_names.append((cisco.hostname, ent.name))
+                    trunks.append(ent.trunk_allowed_bits)
+            carried.append(carried_bits)
+        self.defined = bits_to_matrix(defined)
+        self.carried = bits_to_matrix(carried)
+        self.trunks = bits_to_matrix(trunks)
+
+    def trunks_carrying(self, vlan):
+        """
+        Returns list of (hostname, interface) of trunks which allow VLAN
+        """
+        return [self.trunk_names[num] for num in np.flatnonzero(self.trunks[:, vlan])]
+
+    def devices_defining(self, vlan):
+        return [self.hostnames[num] for num in np.flatnonzero(self.defined[:, vlan])]
+
+    def defined_not_carried(self):
+        """
+        Returns list of VLANs defined on any device but not carried by any trunk or access port of estate
+        """
+        return np.flatnonzero(self.defined.any(axis=0) & ~self.carried.any(axis=0)).tolist()
+
+    def defined_not_carried_by_device(self):
+        """
+        Returns dictionary {hostname: list of VLANs defined on device but not carried by its ports}
+        """
+        unused = self.defined & ~self.carried
+        return {self.hostnames[num]: np.flatnonzero(unused[num]).tolist() for num in np.flatnonzero(unused.any(axis=1))}
+
+    def vlan_counts(self):
+        """
+        Returns number of devices where VLAN is defined and number of trunks which allow VLAN, arrays of 4096
+        """
+        return self.defined.sum(axis=0), self.trunks.sum(axis=0)
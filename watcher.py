@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Watch mode for directories of configurations and cdp files
+#
+# alexeykr@gmail.com
+# coding=utf-8
+# import codecs
+"""
+Watcher of directories with configurations and outputs of 'show cdp neighbor detail'.
+Only created/modified/removed files are parsed again, only csv files of changed devices
+are written again, all_* reports are written from cached rows of unchanged devices.
+Changes are read from inotify (inotify_simple) on Linux, otherwise files are polled.
+version: 1.0
+@author: alexeykr@gmail.com
+"""
+
+import fnmatch
+import functools
+import glob
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import akarlibs.csvexport as csvexport
+from .akarlogging import get_color_logger
+from .ciscocfg import iter_parsed, parse_cdp_data, parse_cdp_file, parse_config_data, parse_config_file
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+_INOTIFY_MASK = 0
+if INotify is not None:
+    _INOTIFY_MASK = inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO | inotify_flags.MOVED_FROM | inotify_flags.DELETE
+
+
+def _replace_csv(path, header, rows):
+    # readers of reports never see partially written file
+    csvexport.write_csv(f'{path}.tmp', header, rows)
+    os.replace(f'{path}.tmp', path)
+
+
+class WatchDevices():
+    """[Class WatchDevices]
+
+    Keeps reports of ListDevices current: files matching path_to_config/path_to_cdp are parsed once,
+    after that only changed files are parsed and only affected reports are written.
+    Devices and rows of reports are kept per file, in order of files.
+    Files are parsed by ciscocfg.iter_parsed (cache, members of archives) in one pool of processes
+    kept between updates, close() stops it.
+    """
+
+    def __init__(self, path_to_config, path_to_cdp=None, out_dir="output", reports=tuple(csvexport.REPORTS), flag_l3_int=True, flag_vlans=False, flag_l2_int=False,
+                 dbg=logging.INFO, workers=1, cache=None, streaming=False, config_members='*', cdp_members='*'):
+        self.__logger = get_color_logger("WatchDevices", dbg)
+        for report in reports:
+            if report not in csvexport.REPORTS:
+                raise ValueError(f'Unknown report: {report}')
+        self.patterns = {'config': f'{path_to_config}'}
+        if path_to_cdp is not None:
+            self.patterns['cdp'] = f'{path_to_cdp}'
+        self.out_dir = out_dir
+        self.reports = reports
+        self.workers = workers
+        self.cache = cache
+        options = dict(flag_l3_int=flag_l3_int, flag_vlans=flag_vlans, flag_l2_int=flag_l2_int, dbg=dbg, streaming=streaming)
+        # kind: (function for file, function for member of archive, pattern of members, options of cache)
+        self._parsers = {
+            'config': (functools.partial(parse_config_file, **options), functools.partial(parse_config_data, **options), config_members,
+                       f'l3_int={flag_l3_int};vlans={flag_vlans};l2_int={flag_l2_int}'),
+            'cdp': (parse_cdp_file, parse_cdp_data, cdp_members, ''),
+        }
+        self._pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        # kind: {file: list of devices of file}
+        self.devices = {kind: dict() for kind in self.patterns}
+        # (report, file): rows of all devices of file, for all_* reports
+        self.rows = dict()
+        # file: groups of networks {network: list of interfaces} of devices of file
+        self.networks = dict()
+        # file: set of per-device csv files written for file
+        self.written = dict()
+        self.errors = dict()
+        if not os.path.exists(f'{out_dir}'):
+            os.makedirs(f'{out_dir}')
+        files = {kind: sorted(glob.glob(pattern)) for kind, pattern in self.patterns.items()}
+        self.update(files, initial=True)
+
+    @property
+    def hostnames(self):
+        return [dev for devs in self.devices['config'].values() for dev in devs]
+
+    @property
+    def hostnames_cdp(self):
+        return [dev for devs in self.devices.get('cdp', dict()).values() for dev in devs]
+
+    def kind_of(self, file_name):
+        for kind, pattern in self.patterns.items():
+            if fnmatch.fnmatch(file_name, pattern):
+                return kind
+        return None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _parse(self, kind, files):
+        # list of (label, (device, error)) for every file
+        (func, func_data, members, options) = self._parsers[kind]
+        results = {file_name: [] for file_name in files}
+        for (file_name, label, res) in iter_parsed(kind, files, func, func_data, members=members, options=options, cache=self.cache,
+                                                   pool=self._pool, prefetch=2 * self.workers):
+            results[file_name].append((label, res))
+        return [results[file_name] for file_name in files]
+
+    def update(self, files, initial=False):
+        """
+        Parses files {kind: list of files}, removed files are dropped,
+        writes csv files of changed devices and all_* reports which have rows of changed devices
+        """
+        changed = {kind: [] for kind in self.patterns}
+        for kind, kind_files in files.items():
+            existing = [file_name for file_name in kind_files if os.path.isfile(file_name)]
+            for file_name in kind_files:
+                if file_name not in existing:
+                    self.__logger.info(f'Removed: {file_name}')
+                    self.devices[kind].pop(file_name, None)
+                    self.errors.pop(file_name, None)
+                    changed[kind].append(file_name)
+            for file_name, res in zip(existing, self._parse(kind, existing)):
+                devs = []
+                self.errors.pop(file_name, None)
+                for label, (dev, error) in res:
+                    if error is not None:
+                        self.__logger.error(f'File: {label} Error: {error}')
+                        self.errors[file_name] = error
+                    else:
+                        devs.append(dev)
+                if not initial:
+                    self.__logger.info(f'Parsed: {file_name} devices: {len(devs)}')
+                self.devices[kind][file_name] = devs
+                changed[kind].append(file_name)
+        self._write_reports(changed, initial)
+        return changed
+
+    def _write_reports(self, changed, initial=False):
+        for kind, kind_files in changed.items():
+            if not kind_files and not initial:
+                continue
+            kind_reports = [report for report in self.reports if csvexport.REPORTS[report][0] == kind]
+            for file_name in kind_files:
+                self._write_device_reports(kind, kind_reports, file_name)
+            for report in kind_reports:
+                if csvexport.REPORTS[report][3] is not None and not csvexport.is_device_report(report):
+                    rows = (row for file_name in self.devices[kind] for row in self.rows.get((report, file_name), ()))
+                    _replace_csv(f'{self.out_dir}/{csvexport.REPORTS[report][1]}', csvexport.REPORTS[report][2], rows)
+            if kind == 'config' and 'l3_int_network' in self.reports:
+                groups = dict()
+                for file_name in self.devices[kind]:
+                    for net, net_ints in self.networks.get(file_name, dict()).items():
+                        groups.setdefault(net, list()).extend(net_ints)
+                path = f'{self.out_dir}/{csvexport.REPORTS["l3_int_network"][1]}'
+                csvexport.write_network_report(f'{path}.tmp', groups)
+                os.replace(f'{path}.tmp', path)
+
+    def _write_device_reports(self, kind, kind_reports, file_name):
+        devs = self.devices[kind].get(file_name, [])
+        written = set()
+        for report in kind_reports:
+            rows_fn = csvexport.REPORTS[report][3]
+            if rows_fn is None:
+                continue
+            if csvexport.is_device_report(report):
+                for cisco in devs:
+                    rows = rows_fn(cisco)
+                    if rows:
+                        path = f'{self.out_dir}/{csvexport.device_file_name(report, cisco.hostname)}'
+                        _replace_csv(path, csvexport.REPORTS[report][2], rows)
+                        written.add(path)
+            elif devs:
+                self.rows[(report, file_name)] = [row for cisco in devs for row in rows_fn(cisco)]
+            else:
+                self.rows.pop((report, file_name), None)
+        if kind == 'config' and 'l3_int_network' in kind_reports:
+            if devs:
+                groups = dict()
+                for cisco in devs:
+                    csvexport.add_network_rows(groups, cisco)
+                self.networks[file_name] = groups
+            else:
+                self.networks.pop(file_name, None)
+        for path in self.written.get(file_name, set()) - written:
+            # the same hostname can be in other file
+            if os.path.exists(path) and not any(path in paths for other, paths in self.written.items() if other != file_name):
+                os.remove(path)
+        if written:
+            self.written[file_name] = written
+        else:
+            self.written.pop(file_name, None)
+
+    def iter_changes(self, interval=1.0):
+        """
+        Yields dictionaries {kind: list of changed files}, by inotify if available, otherwise by polling every interval seconds
+        """
+        if INotify is not None:
+            yield from self._iter_inotify(interval)
+        else:
+            yield from self._iter_polling(interval)
+
+    def _iter_inotify(self, interval):
+        inotify = INotify()
+        dirs = dict()
+        for pattern in self.patterns.values():
+            for dir_name in glob.glob(os.path.dirname(pattern) or '.'):
+                if os.path.isdir(dir_name) and dir_name not in dirs.values():
+                    dirs[inotify.add_watch(dir_name, _INOTIFY_MASK)] = dir_name
+        self.__logger.info(f'Watching (inotify): {sorted(dirs.values())}')
+        with inotify:
+            while True:
+                changes = dict()
+                # events of one copy of backup are collected during read_delay
+                for event in inotify.read(timeout=int(interval * 1000), read_delay=200):
+                    file_name = os.path.join(dirs[event.wd], event.name)
+                    kind = self.kind_of(file_name)
+                    if kind is not None and file_name not in changes.setdefault(kind, []):
+                        changes[kind].append(file_name)
+                if changes:
+                    yield changes
+
+    def _iter_polling(self, interval):
+        self.__logger.info(f'Watching (polling every {interval}s): {sorted(self.patterns.values())}')
+        stats = self._stat_files()
+        while True:
+            time.sleep(interval)
+            current = self._stat_files()
+            changes = dict()
+            for file_name in set(stats) | set(current):
+                if stats.get(file_name) != current.get(file_name):
+                    changes.setdefault(self.kind_of(file_name), []).append(file_name)
+            stats = current
+            if changes:
+                yield changes
+
+    def _stat_files(self):
+        resp = dict()
+        for pattern in self.patterns.values():
+            for file_name in glob.glob(pattern):
+                try:
+                    st = os.stat(file_name)
+                except OSError:
+                    continue
+                resp[file_name] = (st.st_mtime_ns, st.st_size)
+        return resp
+
+    def run(self, interval=1.0, max_updates=None):
+        """
+        Updates reports on every change of files, max_updates limits number of updates (None - forever)
+        """
+        num = 0
+        for changes in self.iter_changes(interval):
+            self.update(changes)
+            num += 1
+            if max_updates is not None and num >= max_updates:
+                break
+